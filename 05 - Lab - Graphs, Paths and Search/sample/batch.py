@@ -0,0 +1,80 @@
+''' Batched path planning, spread over a pool of worker processes.
+
+Many (source, target) queries on the same graph are shared out to worker
+processes, one search per query, and the Path results are returned in the
+same order as the queries.
+
+The graph is given to each worker once, when the pool is started, not with
+each query. Where the operating system can "fork" a process (Linux, macOS) the
+workers simply inherit the graph already in memory. Otherwise (Windows) the
+graph is pickled once for each worker, so it (and its cost_h function) must be
+picklable. If the graph changes, start a new planner.
+
+Example:
+	with BatchPlanner(world.graph) as planner:
+		paths = planner.plan([(0, 17), (3, 40), (5, 6)], search=4)
+
+'''
+import os
+import multiprocessing
+from searches import SEARCHES, _redo
+
+_graph = None # the graph searched by this (worker) process
+
+
+def _init_worker(graph):
+	global _graph
+	_graph = graph
+
+def _plan(query):
+	search, source_idx, target_idx, limit, lean = query
+	path = SEARCHES[search](_graph, source_idx, target_idx, limit)
+	if lean: # only the path and cost are sent back
+		path.lean()
+	return path
+
+
+class BatchPlanner(object):
+	''' A pool of worker processes that each hold a copy of one graph. '''
+
+	def __init__(self, graph, processes=None):
+		self.graph = graph
+		self.processes = processes or os.cpu_count() or 1
+		if 'fork' in multiprocessing.get_all_start_methods():
+			# forked workers inherit the graph (copy-on-write), no pickling
+			context = multiprocessing.get_context('fork')
+		else:
+			context = multiprocessing.get_context()
+		self.pool = context.Pool(self.processes, _init_worker, (graph,))
+
+	def plan(self, queries, search=4, limit=0, chunksize=None, lean=False):
+		''' Search for a path for each (source_idx, target_idx) in queries,
+		using the SEARCHES search number given. Returns a list of Path. If
+		lean, only the path and cost of each are sent back from the workers
+		(see Path.lean), which is much quicker for big searches. '''
+		jobs = [(search, s, t, limit, lean) for s, t in queries]
+		if chunksize is None: # a few chunks for each worker
+			chunksize = max(1, len(jobs) // (4 * self.processes))
+		paths = self.pool.map(_plan, jobs, chunksize)
+		if lean: # any details asked for are searched for again here
+			for path, (s, t) in zip(paths, queries):
+				path.lean(_redo(self.graph, search, s, t, limit))
+		return paths
+
+	def close(self):
+		''' Stop the worker processes. '''
+		self.pool.close()
+		self.pool.join()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+def plan_paths(graph, queries, search=4, limit=0, processes=None, lean=False):
+	''' Plan one batch of queries with a temporary BatchPlanner. Starting a
+	pool takes time, so keep a BatchPlanner to plan many batches. '''
+	with BatchPlanner(graph, processes) as planner:
+		return planner.plan(queries, search, limit, lean=lean)
@@ -0,0 +1,199 @@
+''' Reproducible (seeded) benchmark of the searches on generated maps.
+
+Random box world maps are made for each size and profile (mix of wall, mud and
+water boxes), and every search in SEARCHES (but the SLOW ones, unless asked
+for) is run over the same seeded set of (start, target) queries on each map.
+The time, search counters (expanded and generated nodes), peak memory and path
+costs are recorded. No window is opened.
+
+Results can be saved to a JSON file and used as the baseline for a later run
+(say, after a change to searches.py or graph.py), which then shows each time
+as a ratio of the baseline time and flags any change to the paths found.
+
+Usage:
+	python benchmark.py                              (default sizes)
+	python benchmark.py --large                      (and 1024, 2048: slow!)
+	python benchmark.py --sizes 64 256 1024 2048
+	python benchmark.py --save before.json
+	python benchmark.py --baseline before.json
+	python benchmark.py --searches 3 4 7 --profiles mixed --maps bench_maps
+
+Timing is only comparable on the same machine, so the baseline file notes the
+Python version and platform it was made with.
+
+ARA* normally stops when its time budget runs out, so its path would change
+with the speed of the machine. Here it is given no budget (it runs until its
+path is optimal), so its paths can be compared too.
+
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tracemalloc
+from statistics import median
+from time import perf_counter
+import searches
+from searches import SEARCHES
+from box_map import BoxMap
+
+# profile name: (wall, mud, water) fraction of boxes
+PROFILES = {
+	'open': (0.10, 0.05, 0.02),
+	'mixed': (0.20, 0.15, 0.10),
+	'walls': (0.35, 0.05, 0.05),
+}
+SIZES = (64, 128, 256, 512)
+LARGE = (1024, 2048) # added by --large
+SLOW = (11,) # IDA* can take minutes on the big maps, so only run if asked for
+OPTIONS = {10: {'budget': float('inf')}} # extra search arguments (ARA*: no time limit)
+
+
+def search_name(search):
+	return SEARCHES[search].__name__.replace('Search', '', 1)
+
+def make_map(size, profile, seed, map_dir=None):
+	''' The (seeded) random map of size x size boxes for profile. If map_dir is
+	given, the map is saved there (as a normal map file) or loaded from there
+	if it has already been saved. Returns (key, map, seconds to build). '''
+	key = '%d-%s' % (size, profile)
+	start = perf_counter()
+	filename = os.path.join(map_dir, '%s-%s.txt' % (key, seed)) if map_dir else None
+	if filename and os.path.exists(filename):
+		world = BoxMap.FromFile(filename)
+	else:
+		wall, mud, water = PROFILES[profile]
+		world = BoxMap.Random(size, size, wall, mud, water, seed='%s-%s' % (seed, key))
+		if filename:
+			os.makedirs(map_dir, exist_ok=True)
+			world.save(filename, 'benchmark map %s (seed %s)' % (key, seed))
+	world.graph # (built the first time it is used, so it is timed here)
+	return key, world, perf_counter() - start
+
+def make_queries(world, count, seed):
+	''' A seeded list of (source, target) pairs of different non-wall boxes. '''
+	rand = random.Random(seed)
+	idxs = [i for i in range(len(world.types)) if world.tile_type(i) != 'WALL']
+	if len(idxs) < 2:
+		return []
+	return [tuple(rand.sample(idxs, 2)) for i in range(count)]
+
+def run_search(world, search, queries, memory_queries=3):
+	''' Run one search over all the queries. Returns a dict of results. '''
+	graph = world.graph
+	options = OPTIONS.get(search, {})
+	times = []
+	totals = {'expanded': 0, 'generated': 0, 'pushes': 0}
+	found, cost = 0, 0.0
+	for source_idx, target_idx in queries:
+		start = perf_counter()
+		path = SEARCHES[search](graph, source_idx, target_idx, **options)
+		times.append(perf_counter() - start)
+		for key in totals:
+			totals[key] += path.stats[key]
+		if path.path:
+			found += 1
+			cost += path.cost
+	# memory tracing slows everything down, so only a few queries are traced
+	peak = 0
+	tracemalloc.start()
+	for source_idx, target_idx in queries[:memory_queries]:
+		tracemalloc.reset_peak()
+		SEARCHES[search](graph, source_idx, target_idx, **options)
+		peak = max(peak, tracemalloc.get_traced_memory()[1])
+	tracemalloc.stop()
+	result = {
+		'time_total': sum(times),
+		'time_median': median(times) if times else 0.0,
+		'found': found,
+		'cost': cost,
+		'peak_kb': peak / 1024,
+	}
+	result.update(totals)
+	return result
+
+def run(sizes, profiles, search_ids, count, seed, map_dir=None, echo=print):
+	''' Run the benchmark. Returns the results as a dict (saved as JSON). '''
+	results = {
+		'meta': {
+			'seed': seed, 'queries': count, 'sizes': list(sizes),
+			'profiles': list(profiles), 'python': sys.version.split()[0],
+			'platform': platform.platform(),
+		},
+		'maps': {},
+		'results': {},
+	}
+	was = searches.STATS
+	searches.STATS = True # the searches count their expanded nodes etc
+	try:
+		for size in sizes:
+			for profile in profiles:
+				key, world, build = make_map(size, profile, seed, map_dir)
+				start = perf_counter()
+				world.hierarchy() # (so the HPA* cluster graph isn't in the times)
+				setup = perf_counter() - start
+				results['maps'][key] = {
+					'boxes': len(world.types),
+					'edges': world.graph.num_edges(),
+					'build': build,
+					'hpa_setup': setup,
+				}
+				queries = make_queries(world, count, '%s-%s-queries' % (seed, key))
+				for search in search_ids:
+					name = '%s/%s' % (key, search_name(search))
+					results['results'][name] = run_search(world, search, queries)
+					echo(format_result(name, results['results'][name]))
+	finally:
+		searches.STATS = was
+	return results
+
+def format_result(name, result, base=None):
+	line = '%-24s %9.2fms %9.3fs %10d exp %9.0fKB %3d found' % (name,
+		result['time_median'] * 1000, result['time_total'], result['expanded'],
+		result['peak_kb'], result['found'])
+	if base:
+		ratio = result['time_total'] / base['time_total'] if base['time_total'] else 0.0
+		line += '  x%.2f time' % ratio
+		if (result['found'], round(result['cost'], 6)) != (base['found'], round(base['cost'], 6)):
+			line += '  PATHS CHANGED'
+		elif result['expanded'] != base['expanded']:
+			line += '  expanded %+d' % (result['expanded'] - base['expanded'])
+	return line
+
+def compare(results, baseline, echo=print):
+	''' Print each result against the matching baseline result (if any). '''
+	for key in ('seed', 'queries', 'python', 'platform'):
+		if results['meta'].get(key) != baseline['meta'].get(key):
+			echo('note: %s differs from the baseline (%s vs %s)' % (key,
+				results['meta'].get(key), baseline['meta'].get(key)))
+	for name, result in results['results'].items():
+		echo(format_result(name, result, baseline['results'].get(name)))
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark the SEARCHES on generated maps.')
+	parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+		help='map widths (and heights) in boxes, 64 to 2048')
+	parser.add_argument('--large', action='store_true', help='also run the %s maps' % ' and '.join(map(str, LARGE)))
+	parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+	parser.add_argument('--searches', type=int, nargs='+',
+		default=[search for search in SEARCHES if search not in SLOW],
+		choices=list(SEARCHES), help='SEARCHES numbers to run (all but IDA* by default)')
+	parser.add_argument('--queries', type=int, default=20, help='queries for each map')
+	parser.add_argument('--seed', default='1')
+	parser.add_argument('--maps', help='folder to save (or reuse) the map files')
+	parser.add_argument('--save', help='save the results to this JSON file')
+	parser.add_argument('--baseline', help='compare with results saved in this JSON file')
+	args = parser.parse_args()
+
+	sizes = list(args.sizes) + [size for size in LARGE if args.large and size not in args.sizes]
+	results = run(sizes, args.profiles, args.searches, args.queries, args.seed,
+		args.maps, echo=print if not args.baseline else lambda line: None)
+	if args.baseline:
+		with open(args.baseline) as f:
+			compare(results, json.load(f))
+	if args.save:
+		with open(args.save, 'w') as f:
+			json.dump(results, f, indent=1)
@@ -0,0 +1,353 @@
+''' Headless (no window or graphics) box world map and navigation graph.
+
+A BoxMap holds the box types of a box world, the start and target boxes and the
+navigation graph, without any pyglet shapes, so it can be used by scripts such
+as benchmark.py. BoxWorld (box_world.py) adds the path planning of the window
+to it. The box index values and the map file format are the same as for
+BoxWorld (see the box_world.py module doc).
+
+Random maps (in the same format) can be made with BoxMap.Random.
+
+Big maps can also be saved in a binary format: a header (see _BINARY_HEADER)
+with the width, height, start and target, then one byte for each box (its
+position in box_types) in box index order. The boxes are mapped in from the
+file with numpy.memmap rather than parsed, and kept as codes (see BoxTypes)
+rather than turned into a list of names. FromFile reads either format. The
+navigation graph of a map is only built when it is first used, as that takes
+far longer than reading either format (seconds for a 400x400 map). To
+convert a map file from one format to the other:
+
+	python box_map.py map1.txt map1.bmap
+	python box_map.py map1.bmap map1.txt
+
+'''
+import random
+import struct
+try:
+	import numpy as np
+except ImportError: # only the binary map format needs numpy
+	np = None
+from graph import SparseGraph, Node, Edge
+from hpa import HierarchicalPlanner
+from lpa import LPAStar
+
+box_types = {
+	"CLEAR":{"symbol":'.', "cost":{"CLEAR":1, "MUD":2,"WATER":5}, "colour":"WHITE"},
+	"MUD":{"symbol":'m', "cost":{"CLEAR":2, "MUD":4,"WATER":9}, "colour":"BROWN"},
+	"WATER":{"symbol":'~', "cost":{"CLEAR":5, "MUD":9,"WATER":10}, "colour":"AQUA"},
+	"WALL":{"symbol":'X', "colour":"GREY"},
+}
+
+# the lowest cost of any edge, so the heuristic cost never over-estimates
+min_edge_cost = float(min(cost for kind in box_types.values() for cost in kind.get("cost", {}).values()))
+
+symbol_types = {value["symbol"]: key for key, value in box_types.items()}
+
+type_names = list(box_types) # box type of each byte value in a binary map file
+type_codes = {name: code for code, name in enumerate(type_names)}
+
+_BINARY_MAGIC = b'AI4GMAP\0'
+_BINARY_HEADER = struct.Struct('<8sIIIqq') # magic, version, nx, ny, start, target
+
+
+def read_map(filename):
+	''' Read a map file. Returns (nx, ny, start_idx, target_idx, types) where
+	types is the list of box type names in box index order. '''
+	lines = []
+	with open(filename) as f:
+		for line in f.readlines():
+			line = line.strip()
+			if line and not line.startswith('#'):
+				lines.append(line)
+	# first line is the number of boxes width, height
+	nx, ny = [int(bit) for bit in lines.pop(0).split()]
+	# then the start and target boxes
+	s_idx, t_idx = [int(bit) for bit in lines.pop(0).split()]
+	assert len(lines) == ny, "Number of rows doesn't match data."
+	assert 0 <= s_idx < nx*ny and 0 <= t_idx < nx*ny, "Start or target box outside the map."
+	types = []
+	for line in reversed(lines): # the first row is the top
+		bits = line.split()
+		assert len(bits) == nx, "Number of columns doesn't match data."
+		types.extend(symbol_types[bit] for bit in bits)
+	return nx, ny, s_idx, t_idx, types
+
+def write_map(filename, nx, ny, start_idx, target_idx, types, comment=None):
+	''' Write a map file (the same format read_map and BoxWorld read). '''
+	with open(filename, 'w') as f:
+		if comment:
+			f.write('# %s\n' % comment)
+		f.write('%d %d\n' % (nx, ny))
+		f.write('%d %d\n' % (start_idx, target_idx))
+		for y in reversed(range(ny)):
+			row = types[y*nx:(y+1)*nx]
+			f.write(' '.join(box_types[kind]["symbol"] for kind in row) + '\n')
+
+def is_binary_map(filename):
+	''' Return True if filename is a binary map file (not a text one). '''
+	with open(filename, 'rb') as f:
+		return f.read(len(_BINARY_MAGIC)) == _BINARY_MAGIC
+
+def read_binary_map(filename, mmap=True):
+	''' Read a binary map file. Returns (nx, ny, start_idx, target_idx, codes)
+	where codes is an array of the box type codes (see type_names) in box
+	index order, mapped read-only from the file (unless mmap is False). '''
+	with open(filename, 'rb') as f:
+		header = f.read(_BINARY_HEADER.size)
+	if len(header) < _BINARY_HEADER.size:
+		raise ValueError('%s is not a binary map file' % filename)
+	magic, version, nx, ny, s_idx, t_idx = _BINARY_HEADER.unpack(header)
+	if magic != _BINARY_MAGIC or version != 1:
+		raise ValueError('%s is not a binary map file' % filename)
+	n = nx * ny
+	if mmap and n:
+		codes = np.memmap(filename, dtype=np.uint8, mode='r', offset=_BINARY_HEADER.size, shape=(n,))
+	else:
+		codes = np.fromfile(filename, dtype=np.uint8, count=n, offset=_BINARY_HEADER.size)
+	if len(codes) != n:
+		raise ValueError("Number of boxes doesn't match data.")
+	if n and codes.max() >= len(type_names):
+		raise ValueError('%s has an unknown box type code' % filename)
+	if not (0 <= s_idx < n and 0 <= t_idx < n):
+		raise ValueError('%s has a start or target box outside the map' % filename)
+	return nx, ny, s_idx, t_idx, codes
+
+def write_binary_map(filename, nx, ny, start_idx, target_idx, types):
+	''' Write a binary map file. types is a list of box type names (or an
+	array of their codes, or BoxTypes) in box index order. '''
+	if isinstance(types, BoxTypes):
+		types = types.codes
+	if isinstance(types, np.ndarray):
+		codes = types.astype(np.uint8, copy=False)
+	else:
+		codes = np.fromiter((type_codes[kind] for kind in types), dtype=np.uint8, count=nx*ny)
+	assert len(codes) == nx * ny, 'wrong number of box types'
+	with open(filename, 'wb') as f:
+		f.write(_BINARY_HEADER.pack(_BINARY_MAGIC, 1, nx, ny, start_idx, target_idx))
+		f.write(np.ascontiguousarray(codes).tobytes())
+
+def convert_map(src, dst, comment=None):
+	''' Convert a text map file to a binary one, or a binary one to text. '''
+	if is_binary_map(src):
+		nx, ny, s_idx, t_idx, codes = read_binary_map(src)
+		write_map(dst, nx, ny, s_idx, t_idx, BoxTypes(codes), comment)
+	else:
+		write_binary_map(dst, *read_map(src))
+
+
+class BoxTypes(object):
+	''' The box type names of a map, kept as an array of their codes (see
+	type_names), as read from a binary map file. Indexing, slicing, len and
+	iteration give names, the same as the list of names of a text map. If
+	the array is read-only (mapped from the file) it is copied the first time
+	a type is set, so the file is never changed. '''
+
+	def __init__(self, codes):
+		self.codes = codes
+		self._codes = memoryview(codes) # (gives ints, quicker than the array)
+
+	def __len__(self):
+		return len(self.codes)
+
+	def __getitem__(self, idx):
+		if isinstance(idx, slice):
+			return [type_names[code] for code in self._codes[idx]]
+		return type_names[self._codes[idx]]
+
+	def __setitem__(self, idx, type):
+		if not self.codes.flags.writeable:
+			self.codes = np.array(self.codes)
+			self._codes = memoryview(self.codes)
+		self._codes[idx] = type_codes[type]
+
+	def __iter__(self):
+		return (type_names[code] for code in self._codes)
+
+
+class BoxMap(object):
+	''' The box types and navigation graph of a box world, without graphics. '''
+
+	def __init__(self, x_boxes, y_boxes, types=None):
+		self.x_boxes = x_boxes
+		self.y_boxes = y_boxes
+		if isinstance(types, BoxTypes): # kept as codes (see FromFile)
+			self.types = types
+		else:
+			self.types = list(types) if types else ["CLEAR"] * (x_boxes * y_boxes)
+		assert len(self.types) == x_boxes * y_boxes, 'wrong number of box types'
+		self.start = 1 # box idx values
+		self.target = 2
+		self._graph = None # navigation graph, built when first needed
+		self.hpa = None # hierarchical planner, built when first needed
+		self.lpa = None # incremental planner, built when first needed
+
+	@property
+	def graph(self):
+		''' The navigation graph. It is built the first time it is needed, so
+		loading (or making) a big map doesn't wait for it. '''
+		if self._graph is None:
+			self.reset_navgraph()
+		return self._graph
+
+	def tile_type(self, idx):
+		''' Return the box type name ("CLEAR", "WALL" etc) of the box idx. '''
+		return self.types[idx]
+
+	def set_type(self, idx, type):
+		''' Change the type of box idx and update the navigation graph. '''
+		self.types[idx] = type
+		self.box_changed(idx)
+		self.update_navgraph(idx)
+
+	def box_changed(self, idx):
+		if self.hpa:
+			self.hpa.mark_dirty(idx)
+		if self.lpa:
+			self.lpa.mark_dirty(idx)
+
+	def hierarchy(self):
+		''' Return the hierarchical (HPA*) planner for this map. '''
+		if self.hpa is None:
+			self.hpa = HierarchicalPlanner(self)
+		return self.hpa
+
+	def incremental(self):
+		''' Return the incremental (LPA*) planner for this map. '''
+		if self.lpa is None:
+			self.lpa = LPAStar(self)
+		return self.lpa
+
+	def _manhattan(self, idx1, idx2):
+		''' Manhattan distance between two boxes, times the minimal edge cost. '''
+		nx = self.x_boxes
+		return (abs(idx1 % nx - idx2 % nx) + abs(idx1 // nx - idx2 // nx)) * min_edge_cost
+
+	def _box_neighbours(self, i):
+		''' index values of the boxes four sided N-S-E-W of box i '''
+		nx = self.x_boxes
+		result = []
+		if (i+nx) < len(self.types): # UP
+			result.append(i+nx)
+		if (i-nx) >= 0: # DOWN
+			result.append(i-nx)
+		if (i%nx + 1) < nx: # RIGHT
+			result.append(i+1)
+		if (i%nx - 1) >= 0: # LEFT
+			result.append(i-1)
+		return result
+
+	def _add_edge(self, from_idx, to_idx, distance=1.0):
+		costs = box_types[self.types[from_idx]].get("cost", {})
+		to_type = self.types[to_idx]
+		if to_type in costs:
+			self._graph.add_edge(Edge(from_idx, to_idx, costs[to_type]*distance))
+
+	def _add_box_edges(self, i):
+		''' add the edges from box i to its neighbours '''
+		# four sided N-S-E-W connections
+		if "cost" not in box_types[self.types[i]]:
+			return
+		for j in self._box_neighbours(i):
+			self._add_edge(i, j)
+		# # Diagonal connections
+		# nx = self.x_boxes
+		# # UP LEFT(i + nx - 1)
+		# j = i + nx
+		# if (j-1) < len(self.types) and (j%nx - 1) >= 0:
+		# 	self._add_edge(i, j-1, 1.4142) # sqrt(1+1)
+		# # UP RIGHT (i + nx + 1)
+		# j = i + nx
+		# if (j+1) < len(self.types) and (j%nx + 1) < nx:
+		# 	self._add_edge(i, j+1, 1.4142)
+		# # DOWN LEFT(i - nx - 1)
+		# j = i - nx
+		# if (j-1) >= 0 and (j%nx - 1) >= 0:
+		# 	self._add_edge(i, j-1, 1.4142)
+		# # DOWN RIGHT (i - nx + 1)
+		# j = i - nx
+		# if (j+1) >= 0 and (j%nx +1) < nx:
+		# 	self._add_edge(i, j+1, 1.4142)
+
+	def reset_navgraph(self):
+		''' Create a new navigation graph for the current box types. '''
+		self._graph = SparseGraph()
+		self._graph.cost_h = self._manhattan
+		self._graph.grid = self
+		for i in range(len(self.types)):
+			self._graph.add_node(Node(idx=i))
+		for i in range(len(self.types)):
+			self._add_box_edges(i)
+
+	def update_navgraph(self, idx):
+		''' Update the edges to and from box idx after it has changed type. '''
+		if self._graph is None: # (it will be built with the new type)
+			return
+		neighbours = self._box_neighbours(idx)
+		for j in neighbours:
+			self._graph.remove_edge(idx, j)
+			self._graph.remove_edge(j, idx)
+		self._add_box_edges(idx)
+		for j in neighbours:
+			if "cost" in box_types[self.types[j]]:
+				self._add_edge(j, idx)
+
+	def save(self, filename, comment=None):
+		''' Write this map to a map file. '''
+		write_map(filename, self.x_boxes, self.y_boxes, self.start, self.target,
+			self.types, comment)
+
+	def save_binary(self, filename):
+		''' Write this map to a binary map file. '''
+		write_binary_map(filename, self.x_boxes, self.y_boxes, self.start,
+			self.target, self.types)
+
+	@classmethod
+	def FromFile(cls, filename):
+		''' Load a map file (see the box_world.py module doc for the format), or
+		a binary map file (its types are kept as codes, see BoxTypes). '''
+		if is_binary_map(filename):
+			nx, ny, s_idx, t_idx, codes = read_binary_map(filename)
+			types = BoxTypes(codes)
+		else:
+			nx, ny, s_idx, t_idx, types = read_map(filename)
+		world = cls(nx, ny, types)
+		world.start, world.target = s_idx, t_idx
+		return world
+
+	@classmethod
+	def Random(cls, x_boxes, y_boxes, wall=0.2, mud=0.1, water=0.05, seed=None):
+		''' Make a random map. Rectangles of mud, water and then walls (some
+		long and thin, like corridor walls) are added until each covers about
+		the fraction of the boxes given. The same seed gives the same map. The
+		start and target are two random (non-wall) boxes far apart. '''
+		rand = random.Random(seed)
+		nx, ny = x_boxes, y_boxes
+		types = ["CLEAR"] * (nx * ny)
+		size = max(2, min(nx, ny) // 16) # typical rectangle size
+		for kind, density in (("MUD", mud), ("WATER", water), ("WALL", wall)):
+			remaining = int(density * nx * ny)
+			while remaining > 0:
+				if kind == "WALL" and rand.random() < 0.5: # a thin wall
+					w, h = rand.choice(((1, rand.randint(size, 4*size)), (rand.randint(size, 4*size), 1)))
+				else:
+					w, h = rand.randint(1, size), rand.randint(1, size)
+				x, y = rand.randrange(nx), rand.randrange(ny)
+				for yy in range(y, min(ny, y + h)):
+					for xx in range(x, min(nx, x + w)):
+						types[yy*nx + xx] = kind
+				remaining -= w * h
+		world = cls(nx, ny, types)
+		open_idxs = [i for i, kind in enumerate(types) if kind != "WALL"]
+		if len(open_idxs) > 1:
+			world.start = rand.choice(open_idxs[:len(open_idxs)//4 or 1])
+			world.target = rand.choice(open_idxs[-(len(open_idxs)//4 or 1):])
+		return world
+
+
+if __name__ == '__main__':
+	import argparse
+	parser = argparse.ArgumentParser(description='Convert a map file between the text and binary formats.')
+	parser.add_argument('src', help='map file to read (text or binary)')
+	parser.add_argument('dst', help='map file to write (binary if src is text, text if src is binary)')
+	args = parser.parse_args()
+	convert_map(args.src, args.dst)
@@ -0,0 +1,202 @@
+''' Drawing of a BoxWorld (boxes, start and target, edges and the path) with pyglet.
+
+The BoxWorld (box_world.py) only holds data. A BoxWorldView makes the pyglet
+shapes for it, and the world calls the view methods (box_changed,
+navgraph_reset, navgraph_updated, markers_moved and show_path) as things
+change, so the shapes are kept up to date:
+
+	world = BoxWorld.FromFile('map1.txt')
+	view = BoxWorldView(world, window.width, window.height)
+
+Only the window needs a view. Each box is two shapes (and the edges and path
+are more), which is a lot of GPU objects for a big map.
+
+'''
+import pyglet
+from point2d import Point2D
+from graphics import COLOUR_NAMES, window
+from box_map import box_types
+
+
+class Box(object):
+	'''The shapes of a single box of a boxworld. '''
+
+	def __init__(self, index, x, y, width, height, type='CLEAR'):
+		self.x = x
+		self.y = y
+		self.index = index
+		self.width = width
+		self.height = height
+		#a box must be able to draw:
+		# - a box with a grey outline and an (optional) filled colour
+		self.box = pyglet.shapes.BorderedRectangle(
+			x, y, width, height, border=1,
+			color=COLOUR_NAMES[box_types[type]["colour"]],
+			border_color=COLOUR_NAMES["LIGHT_GREY"],
+			batch=window.get_batch()
+		)
+		# - a label showing the box index
+		self.label = pyglet.text.Label(
+			str(index),
+			font_name='Times New Roman',
+			font_size=12,
+			x=x+width//2, y=y+height//2,
+			anchor_x='center', anchor_y='center',
+			color=COLOUR_NAMES["BLACK"],
+			batch=window.get_batch("numbers")
+		)
+
+	def set_type(self, type):
+		self.box.color = COLOUR_NAMES[box_types[type]["colour"]]
+
+	def center(self):
+		return Point2D(self.x+self.width//2, self.y+self.height//2)
+
+
+class BoxWorldView(object):
+	'''The pyglet shapes that draw a BoxWorld in a window. '''
+
+	def __init__(self, world, window_width, window_height):
+		self.world = world
+		nx, ny = world.x_boxes, world.y_boxes
+		box_width = window_width // nx
+		box_height = window_height // ny
+		self.wx = (window_width-1) // nx
+		self.wy = (window_height-1) // ny
+		self.boxes = [
+			Box(i, i%nx*box_width, i//nx%ny*box_height, box_width, box_height,
+				world.tile_type(i))
+			for i in range(nx*ny)
+		]
+		self.start_marker = pyglet.shapes.Arc( #in pyglet a circle is filled, an arc is unfilled
+			0, 0, 15, segments=30,
+			color=COLOUR_NAMES["RED"],
+			batch=window.get_batch("path"),
+			thickness=4
+		)
+		self.target_marker = pyglet.shapes.Arc(
+			0, 0, 15, segments=30,
+			color=COLOUR_NAMES["GREEN"],
+			batch=window.get_batch("path"),
+			thickness=4
+		)
+
+		#lists used to store the primitives that render out our various pathfinding data
+		self.render_path = []
+		self.render_tree = []
+		self.render_open_nodes = []
+		self.render_graph = {} # dict of {(from_idx, to_idx): line}
+
+		world.graph # (built now if it hasn't been, before this view is told of changes)
+		world.view = self
+		self.markers_moved()
+		self.navgraph_reset()
+		if world.path:
+			self.show_path(world.path)
+
+	def get_box_by_xy(self, ix, iy):
+		idx = (self.world.x_boxes * iy) + ix
+		return self.boxes[idx] if idx < len(self.boxes) else None
+
+	def get_box_by_pos(self, x, y):
+		idx = int((self.world.x_boxes * (y // self.wy)) + (x // self.wx))
+		return self.boxes[idx] if idx < len(self.boxes) else None
+
+	def box_changed(self, idx):
+		self.boxes[idx].set_type(self.world.tile_type(idx))
+
+	def markers_moved(self):
+		start = self.boxes[self.world.start].center()
+		self.start_marker.x, self.start_marker.y = start.x, start.y
+		target = self.boxes[self.world.target].center()
+		self.target_marker.x, self.target_marker.y = target.x, target.y
+
+	def _delete(self, shapes):
+		for shape in shapes:
+			try:
+				shape.delete() #pyglets Line.delete method is slightly broken
+			except:
+				pass
+
+	def _render_edge(self, start, target):
+		self.render_graph[start, target] = pyglet.shapes.Line(
+			self.boxes[start].center().x,
+			self.boxes[start].center().y,
+			self.boxes[target].center().x,
+			self.boxes[target].center().y,
+			thickness=0.5,
+			color=COLOUR_NAMES['PURPLE'],
+			batch=window.get_batch("edges")
+		)
+
+	def navgraph_reset(self):
+		''' Render every edge of the (new) nav graph. '''
+		self._delete(self.render_graph.values())
+		self.render_graph = {}
+		for start, edge in self.world.graph.edgelist.items():
+			for target in edge.keys():
+				self._render_edge(start, target)
+		self.show_path(None)
+
+	def navgraph_updated(self, idx):
+		''' Render the edges to and from box idx again. '''
+		graph = self.world.graph
+		for j in self.world._box_neighbours(idx):
+			for edge in ((idx, j), (j, idx)):
+				if edge in self.render_graph:
+					self._delete([self.render_graph.pop(edge)])
+				if graph.is_edge(*edge):
+					self._render_edge(*edge)
+
+	def show_path(self, path):
+		'''Render the path, search tree and open nodes of a Path (or nothing,
+		if path is None).'''
+		self._delete(self.render_path)
+		self._delete(self.render_tree)
+		self._delete(self.render_open_nodes)
+		self.render_path, self.render_tree, self.render_open_nodes = [], [], []
+		if path is None:
+			return
+		#render the final path
+		p = path.path # alias to save us some typing
+		if(len(p) > 1):
+			for idx in range(len(p)-1):
+				self.render_path.append(
+					pyglet.shapes.Line(
+						self.boxes[p[idx]].center().x,
+						self.boxes[p[idx]].center().y,
+						self.boxes[p[idx+1]].center().x,
+						self.boxes[p[idx+1]].center().y,
+						thickness=3,
+						color=COLOUR_NAMES['BLUE'],
+						batch=window.get_batch("path")
+					)
+				)
+		#render the search tree
+		t = path.route # alias to save us some typing
+		if(len(t) > 1):
+			for start, end in t.items():
+				self.render_tree.append(
+					pyglet.shapes.Line(
+						self.boxes[start].center().x,
+						self.boxes[start].center().y,
+						self.boxes[end].center().x,
+						self.boxes[end].center().y,
+						thickness=2,
+						color=COLOUR_NAMES['PINK'],
+						batch=window.get_batch("tree")
+					)
+				)
+		#render the nodes that were still on the search stack when the search ended
+		o = path.open # alias to save us some typing
+		if(len(o) > 0):
+			for idx in o:
+				self.render_open_nodes.append(
+					pyglet.shapes.Circle(
+						self.boxes[idx].center().x,
+						self.boxes[idx].center().y,
+						5,
+						color=COLOUR_NAMES['ORANGE'],
+						batch=window.get_batch("tree")
+					)
+				)
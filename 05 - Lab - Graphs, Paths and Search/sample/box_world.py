@@ -8,6 +8,11 @@ permission.
 
 See readme.txt for details. Look for ### comment lines.
 
+A BoxWorld is only data: the box types, the start and target boxes, the
+navigation graph and the planned path. It does not need a window (or pyglet),
+so scripts and tests can load and search maps without one. The window draws it
+with a BoxWorldView (see box_view.py), which the world tells about each change.
+
 Note that the box world "boxes" (tiles) are created and assigned an index (idx)
 value, starting from the origin in the bottom left corder. This matches the
 convention of coordinates used by pyglet which uses OpenGL, rather than a
@@ -47,166 +52,62 @@ Example BoxWorld map file.
 
 '''
 from math import hypot
-from enum import Enum
-from graphics import COLOUR_NAMES, window
-import pyglet
-from point2d import Point2D
-from graph import SparseGraph, Node, Edge
-from searches import SEARCHES
-
-box_types = {
-	"CLEAR":{"symbol":'.', "cost":{"CLEAR":1, "MUD":2,"WATER":5}, "colour":"WHITE"},
-	"MUD":{"symbol":'m', "cost":{"CLEAR":2, "MUD":4,"WATER":9}, "colour":"BROWN"},
-	"WATER":{"symbol":'~', "cost":{"CLEAR":5, "MUD":9,"WATER":10}, "colour":"AQUA"},
-	"WALL":{"symbol":'X', "colour":"GREY"},
-}
-
-min_edge_cost = 10.0 # must be min value for heuristic cost to work
-
-# def edge_cost(k1, k2):
-# 	k1 = box_type.index(k1)
-# 	k2 = box_type.index(k2)
-# 	return edge_cost_matrix[k1][k2]
+import searches
+from searches import SEARCHES, PathCache, ResumableSearch
+from box_map import BoxMap, box_types, symbol_types, min_edge_cost
 
 search_modes = list(SEARCHES.keys())
 
-class Box(object):
-	'''A single box for boxworld. '''
-
-	def __init__(self,index, x, y, width, height, type='.'):
-		self.x = x
-		self.y = y
-		self.index = index
-		self.width = width
-		self.height = height
-		for key, value in box_types.items():
-			if value['symbol'] == type:
-				self.type = key
-		#a box must be able to draw:
-		# - a box with a grey outline and an (optional) filled colour
-		self.box = pyglet.shapes.BorderedRectangle(
-			x, y, width, height, border=1,
-			color=COLOUR_NAMES[box_types[self.type]["colour"]], 
-			border_color=COLOUR_NAMES["LIGHT_GREY"],
-			batch=window.get_batch()
-		)
-		# - a label showing the box index
-		self.label = pyglet.text.Label(
-			str(index),
-			font_name='Times New Roman',
-			font_size=12,
-			x=x+width//2, y=y+height//2,
-			anchor_x='center', anchor_y='center',
-			color=COLOUR_NAMES["BLACK"],
-			batch=window.get_batch("numbers")
-		)
-		
-		# nav graph node
-		self.node = None
-
-	def set_type(self, type):
-		#this code gets repeated in a couple of places in theis func, so I made it a function-within-a-function
-		#it's usually good practice to make sure things are only ever done in a single location, but sometimes that can make things harder to read
-		def update_box(type):
-			self.type = type
-			self.box.color = COLOUR_NAMES[box_types[self.type]["colour"]]
-		if type in box_types:
-			update_box(type)
-			return
-		else:
-			for key, value in box_types.items():
-				if value['symbol'] == type:
-					update_box(key)
-					return
-		print('not a known tile type "%s"' % type)
-	
-	def center(self):
-		return Point2D(self.x+self.width//2, self.y+self.height//2)
 
-class BoxWorld(object):
-	'''A world made up of boxes. '''
+class BoxWorld(BoxMap):
+	'''A world made up of boxes, and the path planned across it. '''
 
-	def __init__(self, x_boxes, y_boxes, window_width, window_height):
-		self.boxes = [None]*x_boxes*y_boxes
-		self.x_boxes= x_boxes 
-		self.y_boxes= y_boxes 
-		box_width = window_width // x_boxes
-		box_height = window_height // y_boxes
-		self.wx = (window_width-1) // self.x_boxes
-		self.wy = (window_height-1) // self.y_boxes 
-		for i in range(len(self.boxes)):
-			self.boxes[i] = Box(
-				i,
-				i%x_boxes*box_width,
-				i//x_boxes%y_boxes*box_height,
-				box_width,box_height
-			)
-		# create nav_graph
+	def __init__(self, x_boxes, y_boxes, types=None):
+		self.view = None # told about each change (see box_view.py), if any
 		self.path = None
-		self.graph = None
-		
-		self.start = self.boxes[1]
-		self.start_marker = pyglet.shapes.Arc( #in pyglet a circle is filled, an arc is unfilled
-			self.boxes[1].center().x,
-			self.boxes[1].center().y,
-			15, segments=30,
-			color=COLOUR_NAMES["RED"],
-			batch=window.get_batch("path"),
-			thickness=4
-		)
-		self.target = self.boxes[2]
-		self.target_marker = pyglet.shapes.Arc(
-			self.boxes[2].center().x,
-			self.boxes[2].center().y,
-			15, segments=30,
-			color=COLOUR_NAMES["GREEN"],
-			batch=window.get_batch("path"),
-			thickness=4
-		)
-
-		#lists used to store the primitives that render out our various pathfinding data
-		self.render_path = []
-		self.render_tree = []
-		self.render_open_nodes = []
-		self.render_graph = []
-
-		self.reset_navgraph()
-
-	def get_box_by_xy(self, ix, iy):
-		idx = (self.x_boxes * iy) + ix
-		return self.boxes[idx] if idx < len(self.boxes) else None
-
-	def get_box_by_pos(self, x, y):
-		idx = int((self.x_boxes * (y // self.wy)) + (x // self.wx))
-		return self.boxes[idx] if idx < len(self.boxes) else None
-
-	def _add_edge(self, from_idx, to_idx, distance=1.0):
-		b = self.boxes
-		if "cost" in box_types[b[from_idx].type] and b[to_idx].type in box_types[b[from_idx].type]["cost"]:
-			cost = box_types[b[from_idx].type]["cost"][b[to_idx].type]
-			self.graph.add_edge(Edge(from_idx, to_idx, cost*distance))
-
-	def _manhattan(self, idx1, idx2):
-		''' Manhattan distance between two nodes in boxworld, assuming the
-		minimal edge cost so that we don't overestimate the cost). '''
-		x1, y1 = self.boxes[idx1].pos
-		x2, y2 = self.boxes[idx2].pos
-		return (abs(x1-x2) + abs(y1-y2)) * min_edge_cost
+		self.flow = None # flow field to one target, built when first needed
+		self.path_cache = PathCache() # recent search results
+		self.task = None # paused (limited) search, resumed when the limit goes up
+		self.task_key = None
+		# (the box types, start, target and nav graph)
+		super(BoxWorld, self).__init__(x_boxes, y_boxes, types)
+
+	def set_type(self, idx, type):
+		'''Change the type of box idx to a box type name ("MUD") or symbol
+		("m"), and update the nav graph. '''
+		if type not in box_types:
+			if type not in symbol_types:
+				print('not a known tile type "%s"' % type)
+				return
+			type = symbol_types[type]
+		super(BoxWorld, self).set_type(idx, type)
+
+	def box_changed(self, idx):
+		''' Called when the type of box idx is changed. '''
+		super(BoxWorld, self).box_changed(idx)
+		if self.view:
+			self.view.box_changed(idx)
+
+	def flow_field(self, target_idx=None):
+		''' Return the flow field to target_idx (default, the current target)
+		for many agents to follow. It is only recomputed if the target or the
+		navigation graph has changed. Needs numpy. '''
+		if self.flow is None:
+			from flow_field import FlowField # (numpy is only needed for this)
+			self.flow = FlowField(self, box_types)
+		self.flow.update(self.target if target_idx is None else target_idx)
+		return self.flow
 
 	def _hypot(self, idx1, idx2):
 		'''Return the straight line distance between two points on a 2-D
 		Cartesian plane. Argh, Pythagoras... trouble maker. '''
-		x1, y1 = self.boxes[idx1].pos
-		x2, y2 = self.boxes[idx2].pos
-		return hypot(x1-x2, y1-y2) * min_edge_cost
+		nx = self.x_boxes
+		return hypot(idx1 % nx - idx2 % nx, idx1 // nx - idx2 // nx) * min_edge_cost
 
 	def _max(self, idx1, idx2):
-		'''Return the straight line distance between two points on a 2-D
-		Cartesian plane. Argh, Pythagoras... trouble maker. '''
-		x1, y1 = self.boxes[idx1].pos
-		x2, y2 = self.boxes[idx2].pos
-		return max(abs(x1-x2),abs(y1-y2)) * min_edge_cost
-
+		'''Return the largest of the x and y distances between two boxes. '''
+		nx = self.x_boxes
+		return max(abs(idx1 % nx - idx2 % nx), abs(idx1 // nx - idx2 // nx)) * min_edge_cost
 
 	def reset_navgraph(self):
 		''' Create and store a new nav graph for this box world configuration.
@@ -214,194 +115,90 @@ class BoxWorld(object):
 		boxes in box world. Then edges are created (4-sided).
 		'''
 		self.path = None # invalid so remove if present
-		self.graph = SparseGraph()
+		super(BoxWorld, self).reset_navgraph()
 		# Set a heuristic cost function for the search to use
 		self.graph.cost_h = self._manhattan
 		#self.graph.cost_h = self._hypot
 		#self.graph.cost_h = self._max
+		if self.view:
+			self.view.navgraph_reset()
 
-		nx, ny = self.x_boxes, self.y_boxes
-		# add all the nodes required
-		for i, box in enumerate(self.boxes):
-			box.pos = (i % nx, i // nx) #tuple position
-			box.node = self.graph.add_node(Node(idx=i))
-		# build all the edges required for this world
-		for i, box in enumerate(self.boxes):
-			# four sided N-S-E-W connections
-			if "cost" not in box_types[box.type]:
-				continue
-			# UP (i + nx)
-			if (i+nx) < len(self.boxes):
-				self._add_edge(i, i+nx)
-			# DOWN (i - nx)
-			if (i-nx) >= 0:
-				self._add_edge(i, i-nx)
-			# RIGHT (i + 1)
-			if (i%nx + 1) < nx:
-				self._add_edge(i, i+1)
-			# LEFT (i - 1)
-			if (i%nx - 1) >= 0:
-				self._add_edge(i, i-1)
-			# # Diagonal connections
-			# # UP LEFT(i + nx - 1)
-			# j = i + nx
-			# if (j-1) < len(self.boxes) and (j%nx - 1) >= 0:
-			# 	self._add_edge(i, j-1, 1.4142) # sqrt(1+1)
-			# # UP RIGHT (i + nx + 1)
-			# j = i + nx
-			# if (j+1) < len(self.boxes) and (j%nx + 1) < nx:
-			# 	self._add_edge(i, j+1, 1.4142)
-			# # DOWN LEFT(i - nx - 1)
-			# j = i - nx
-			# if (j-1) >= 0 and (j%nx - 1) >= 0:
-			# 	print(i, j, j%nx)
-			# 	self._add_edge(i, j-1, 1.4142)
-			# # DOWN RIGHT (i - nx + 1)
-			# j = i - nx
-			# if (j+1) >= 0 and (j%nx +1) < nx:
-			# 	self._add_edge(i, j+1, 1.4142)
-		
-		# add the graph to the render_graph
-		for line in self.render_graph:
-			try:
-				line.delete() #pyglets Line.delete method is slightly broken
-			except:
-				pass
-		for start, edge in self.graph.edgelist.items():
-			for target in edge.keys():
-				self.render_graph.append(
-					pyglet.shapes.Line(
-						self.boxes[start].center().x, 
-						self.boxes[start].center().y,
-						self.boxes[target].center().x,
-						self.boxes[target].center().y,
-						thickness=0.5, 
-						color=COLOUR_NAMES['PURPLE'],
-						batch=window.get_batch("edges")
-					)
-				)
+	def update_navgraph(self, idx):
+		''' Update the nav graph after box idx has changed type. Only the edges
+		to and from that box are changed. '''
+		self.path = None # invalid so remove if present
+		super(BoxWorld, self).update_navgraph(idx)
+		if self.view:
+			self.view.navgraph_updated(idx)
 
 	def set_start(self, idx):
 		'''Set the start box based on its index idx value. '''
-		# remove any existing start node, set new start node
-		if self.target == self.boxes[idx]:
+		if self.target == idx:
 			print("Can't have the same start and end boxes!")
 			return
-		self.start = self.boxes[idx]
-		self.start_marker.x = self.start.center().x
-		self.start_marker.y = self.start.center().y
+		self.start = idx
+		if self.view:
+			self.view.markers_moved()
 
 	def set_target(self, idx):
 		'''Set the target box based on its index idx value. '''
-		# remove any existing target node, set new target node
-		if self.start == self.boxes[idx]:
+		if self.start == idx:
 			print("Can't have the same start and end boxes!")
 			return
-		self.target = self.boxes[idx]
-		self.target_marker.x = self.target.center().x
-		self.target_marker.y = self.target.center().y
+		self.target = idx
+		if self.view:
+			self.view.markers_moved()
 
 	def plan_path(self, search, limit):
 		'''Conduct a nav-graph search from the current world start node to the
 		current target node, using a search method that matches the string
-		specified in `search`.
+		specified in `search`. Returns the Path.
 		'''
-		cls = SEARCHES[search]
-		self.path = cls(self.graph, self.start.index, self.target.index, limit)
+		if limit > 0:
+			# continue the last limited search if only the limit has gone up
+			key = (self.graph, self.graph.version, self.graph.cost_h, search,
+				self.start, self.target, searches.STATS)
+			if key != self.task_key or self.task.steps > limit:
+				self.task = ResumableSearch(self.graph, search, self.start, self.target)
+				self.task_key = key
+			self.task.step(limit - self.task.steps)
+			path = self.task.result()
+		else:
+			path = self.path_cache.search(self.graph, search, self.start, self.target, limit)
+		self.show_path(path)
+		return path
+
+	def request_path(self, service, search, limit, callback=None):
+		'''Like plan_path, but a full (unlimited) search that isn't cached is
+		run by the PathService, and the path is shown when it is done (as long
+		as it is still wanted). Limited searches are quick, so are done now.
+		Returns the Future of the background search (or None, if the path is
+		shown now), and callback (if any) is called once its path is shown.
+		'''
+		path = None
+		if limit == 0:
+			path = self.path_cache.get(self.graph, search, self.start, self.target)
+		if limit > 0 or path is not None:
+			service.cancel('path') # (its callback is never called)
+			with service.lock:
+				self.plan_path(search, limit)
+			if callback:
+				callback()
+			return None
+		graph, start, target = self.graph, self.start, self.target
+		def found(path):
+			self.path_cache.add(graph, search, start, target, 0, path)
+			self.show_path(path)
+			if callback:
+				callback()
+		return service.submit(graph, search, start, target, channel='path', callback=found)
+
+	def show_path(self, path):
+		'''Keep (and report) the Path, and have the view (if any) draw it.'''
+		if path is self.path:
+			return # nothing has changed, it's already shown
+		self.path = path
 		# print the path details
 		print(self.path.report())
-		#then add them to the renderer
-		#render the final path
-		for line in self.render_path:
-			try:
-				line.delete() #pyglets Line.delete method is slightly broken
-			except:
-				pass
-		p = self.path.path # alias to save us some typing
-		if(len(p) > 1):
-			for idx in range(len(p)-1):
-				self.render_path.append(
-					pyglet.shapes.Line(
-						self.boxes[p[idx]].center().x, 
-						self.boxes[p[idx]].center().y,
-						self.boxes[p[idx+1]].center().x,
-						self.boxes[p[idx+1]].center().y,
-						thickness=3, 
-						color=COLOUR_NAMES['BLUE'],
-						batch=window.get_batch("path")
-					)
-				)
-		for line in self.render_tree:
-			try:
-				line.delete() #pyglets Line.delete method is slightly broken
-			except:
-				pass
-		#render the search tree
-		t = self.path.route # alias to save us some typing
-		if(len(t) > 1):
-			for start, end in t.items():
-				self.render_tree.append(
-					pyglet.shapes.Line(
-						self.boxes[start].center().x, 
-						self.boxes[start].center().y,
-						self.boxes[end].center().x,
-						self.boxes[end].center().y,
-						thickness=2, 
-						color=COLOUR_NAMES['PINK'],
-						batch=window.get_batch("tree")
-					)
-				)
-		for circle in self.render_open_nodes:
-			try:
-				circle.delete() #pyglets Line.delete method is slightly broken
-			except:
-				pass
-		#render the nodes that were still on the search stack when the search ended
-		o = self.path.open # alias to save us some typing
-		if(len(o) > 0):
-			for idx in o:
-				self.render_open_nodes.append(
-					pyglet.shapes.Circle(
-						self.boxes[idx].center().x, 
-						self.boxes[idx].center().y,
-						5, 
-						color=COLOUR_NAMES['ORANGE'],
-						batch=window.get_batch("tree")
-					)
-				)
-
-
-	@classmethod
-	def FromFile(cls, filename ):
-		'''Support a the construction of a BoxWorld map from a simple text file.
-		See the module doc details at the top of this file for format details.
-		'''
-		# open and read the file
-		f = open(filename)
-		lines = []
-		for line in f.readlines():
-			line = line.strip()
-			if line and not line.startswith('#'):
-				lines.append(line)
-		f.close()
-		# first line is the number of boxes width, height
-		nx, ny = [int(bit) for bit in lines.pop(0).split()]
-		# Create a new BoxWorld to store all the new boxes in...
-		world = BoxWorld(nx, ny, window.width, window.height)
-		# Get and set the Start and Target tiles
-		s_idx, t_idx = [int(bit) for bit in lines.pop(0).split()]
-		world.set_start(s_idx)
-		world.set_target(t_idx)
-		# Ready to process each line
-		assert len(lines) == ny, "Number of rows doesn't match data."
-		# read each line
-		idx = 0
-		for line in reversed(lines): # in reverse order
-			bits = line.split()
-			assert len(bits) == nx, "Number of columns doesn't match data."
-			for bit in bits:
-				bit = bit.strip()
-				world.boxes[idx].set_type(bit)
-				idx += 1
-		world.reset_navgraph()
-		return world
\ No newline at end of file
+		if self.view:
+			self.view.show_path(path)
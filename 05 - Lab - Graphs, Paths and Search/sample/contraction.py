@@ -0,0 +1,247 @@
+''' Contraction hierarchy (CH) for fast queries of a static navigation graph.
+
+The nodes are "contracted" (removed) one at a time, least important first.
+When a node v is removed, each path u -> v -> w through it that is the only
+shortest path from u to w (no "witness" path around v is found) is kept as a
+shortcut edge u -> w, with the cost of both edges. The order a node is removed
+in is its rank.
+
+A query is then a bidirectional Dijkstra search that only ever goes *up* the
+ranks: forward from the start, and backward from the target. Every shortest
+path has a highest ranked node, and both searches meet there. As they only
+go up, they settle a few hundred nodes rather than most of the map. The
+shortcuts of the path are unpacked (back to the edges they replaced) at the
+end.
+
+The preprocessing is slow (it is a lot of small searches) and has to be done
+again if the graph changes, so this is for maps that are rarely edited.
+
+Example:
+	ch = ContractionHierarchy.FromGraph(world.graph)
+	path = ch.query(0, 17) # a Path, the same cost as SearchDijkstra
+
+'''
+from heapq import heappush, heappop
+from time import perf_counter
+import searches
+from graph import _node_ids
+from searches import Path
+
+INF = float('inf')
+
+
+class _Contraction(object):
+	''' The remaining (not yet contracted) graph, with shortcuts, while the
+	hierarchy is being built. '''
+
+	def __init__(self, graph, settle_limit):
+		self.settle_limit = settle_limit # most nodes a witness search settles
+		self.out = {} # dict of {idx: {dest: cost}}
+		self.inn = {} # dict of {idx: {src: cost}}
+		for idx in _node_ids(graph):
+			self.out[idx] = {}
+			self.inn[idx] = {}
+		for idx in self.out:
+			for dest in graph.get_neighbours(idx):
+				cost = graph.get_edge(idx, dest).cost
+				if dest != idx and cost < self.out[idx].get(dest, INF):
+					self.out[idx][dest] = cost
+					self.inn[dest][idx] = cost
+		self.removed = dict.fromkeys(self.out, 0) # contracted neighbours count
+
+	def _witness(self, source_idx, avoid_idx, max_cost):
+		''' Costs (dict) from source_idx, not through avoid_idx, up to max_cost
+		and at most settle_limit nodes settled. '''
+		out = self.out
+		cost_g = {source_idx: 0.0}
+		closed = set()
+		open = [(0.0, source_idx)]
+		while open and len(closed) < self.settle_limit:
+			cost, leaf = heappop(open)
+			if leaf in closed:
+				continue
+			if cost > max_cost:
+				break
+			closed.add(leaf)
+			for dest, c in out[leaf].items():
+				if dest == avoid_idx:
+					continue
+				cost_d = cost + c
+				if cost_d < cost_g.get(dest, INF):
+					cost_g[dest] = cost_d
+					heappush(open, (cost_d, dest))
+		return cost_g
+
+	def shortcuts(self, idx):
+		''' List of the (from_idx, to_idx, cost) shortcuts needed if idx is
+		contracted. '''
+		result = []
+		outs = self.out[idx]
+		if not outs:
+			return result
+		for from_idx, cost_in in self.inn[idx].items():
+			max_cost = cost_in + max(outs.values())
+			cost_g = self._witness(from_idx, idx, max_cost)
+			for to_idx, cost_out in outs.items():
+				cost = cost_in + cost_out
+				if to_idx != from_idx and cost_g.get(to_idx, INF) > cost:
+					result.append((from_idx, to_idx, cost))
+		return result
+
+	def priority(self, idx):
+		''' Lower is contracted sooner: the edge difference (shortcuts added
+		less edges removed) plus the neighbours already contracted, so the
+		contracted nodes are spread out. '''
+		return (len(self.shortcuts(idx)) - len(self.inn[idx]) - len(self.out[idx])
+			+ self.removed[idx])
+
+	def contract(self, idx):
+		''' Add the shortcuts for idx and remove it. Returns (up, down, added)
+		where up is the list of (dest, cost) edges out of idx, down is the list
+		of (src, cost) edges into it, and added the list of shortcuts. '''
+		added = []
+		for from_idx, to_idx, cost in self.shortcuts(idx):
+			if cost < self.out[from_idx].get(to_idx, INF):
+				self.out[from_idx][to_idx] = cost
+				self.inn[to_idx][from_idx] = cost
+				added.append((from_idx, to_idx))
+		up = list(self.out.pop(idx).items())
+		down = list(self.inn.pop(idx).items())
+		for dest, cost in up:
+			del self.inn[dest][idx]
+			self.removed[dest] += 1
+		for src, cost in down:
+			del self.out[src][idx]
+			self.removed[src] += 1
+		return up, down, added
+
+
+class ContractionHierarchy(object):
+	''' Node ranks, upward edges and shortcuts of a graph, for fast queries. '''
+
+	def __init__(self, graph, rank, up, down, via):
+		self.graph = graph # the graph (and version) the hierarchy is for
+		self.version = graph.version
+		self.rank = rank # dict of {idx: order contracted}
+		self.up = up # dict of {idx: [(dest, cost), ...]} to higher ranked nodes
+		self.down = down # dict of {idx: [(src, cost), ...]} from higher ranked nodes
+		self.via = via # dict of {(from_idx, to_idx): middle idx} for each shortcut
+
+	def summary(self):
+		edges = sum(len(edges) for edges in self.up.values())
+		edges += sum(len(edges) for edges in self.down.values())
+		return 'CH: %d nodes, %d edges (%d shortcuts)' % (len(self.rank), edges, len(self.via))
+
+	def _unpack(self, from_idx, to_idx, path):
+		''' Append the nodes after from_idx to to_idx (shortcuts replaced by
+		the edges they stand for) to path. '''
+		stack = [(from_idx, to_idx)]
+		while stack:
+			a, b = stack.pop()
+			middle = self.via.get((a, b))
+			if middle is None:
+				path.append(b)
+			else:
+				stack.append((middle, b))
+				stack.append((a, middle))
+
+	def query(self, source_idx, target_idx):
+		''' Return the Path from source_idx to target_idx. The route is the
+		(unpacked) path only, the open and closed nodes are those of both
+		(upward) searches. Raises RuntimeError if the graph has changed since
+		the hierarchy was built. '''
+		if self.graph.version != self.version:
+			raise RuntimeError('the graph has changed since the hierarchy was built')
+		counting = searches.STATS
+		start = perf_counter() if counting else 0.0
+		edges = (self.up, self.down)
+		cost_g = ({source_idx: 0.0}, {target_idx: 0.0})
+		parent = ({source_idx: source_idx}, {target_idx: target_idx})
+		closed = (set(), set())
+		open = (searches._queue(counting), searches._queue(counting))
+		open[0].push(source_idx, 0.0)
+		open[1].push(target_idx, 0.0)
+		best, meet = INF, None
+		steps = generated = 0
+		while True:
+			# step the side with the lowest open cost, until neither can improve
+			d = None
+			for side in (0, 1):
+				if len(open[side]) and open[side].top()[1] < best:
+					if d is None or open[side].top()[1] < open[d].top()[1]:
+						d = side
+			if d is None:
+				break
+			steps += 1
+			leaf, cost = open[d].pop()
+			closed[d].add(leaf)
+			other = cost_g[1 - d].get(leaf)
+			if other is not None and cost + other < best:
+				best, meet = cost + other, leaf
+			if counting:
+				generated += len(edges[d].get(leaf, ()))
+			for dest, c in edges[d].get(leaf, ()):
+				cost_d = cost + c
+				if dest not in closed[d] and cost_d < cost_g[d].get(dest, INF):
+					if dest in open[d]:
+						open[d].decrease_key(dest, cost_d)
+					else:
+						open[d].push(dest, cost_d)
+					cost_g[d][dest] = cost_d
+					parent[d][dest] = leaf
+		route = {source_idx: source_idx} # dict of {to:from} along the path only
+		if meet is not None:
+			# up from the start to the meeting node, then down to the target
+			ups = [meet]
+			while ups[-1] != source_idx:
+				ups.append(parent[0][ups[-1]])
+			ups.reverse()
+			while ups[-1] != target_idx:
+				ups.append(parent[1][ups[-1]])
+			path = [source_idx]
+			for from_idx, to_idx in zip(ups[:-1], ups[1:]):
+				self._unpack(from_idx, to_idx, path)
+			# (zero cost edges can give a path with a loop, so cut any out)
+			loopless, at = [], {}
+			for idx in path:
+				if idx in at:
+					for gone in loopless[at[idx] + 1:]:
+						del at[gone]
+					del loopless[at[idx] + 1:]
+				else:
+					at[idx] = len(loopless)
+					loopless.append(idx)
+			for from_idx, to_idx in zip(loopless[:-1], loopless[1:]):
+				route[to_idx] = from_idx
+		stats = None
+		if counting:
+			stats = searches._stats(start, steps, generated,
+				open[0].i + open[1].i, open[0].pops + open[1].pops,
+				open[0].decreases + open[1].decreases, 0, open[0].peak + open[1].peak)
+		open_idxs = list(open[0]) + list(open[1])
+		if meet is not None: # done, even if a side had the target still open
+			open_idxs = [idx for idx in open_idxs if idx != target_idx]
+		return Path(self.graph, route, target_idx, open_idxs,
+			closed[0] | closed[1], steps, stats)
+
+	@classmethod
+	def FromGraph(cls, graph, settle_limit=64):
+		''' Contract every node of graph (a SparseGraph or FrozenGraph). The
+		witness searches settle at most settle_limit nodes: lower is faster
+		to build but may add shortcuts that are not needed. '''
+		work = _Contraction(graph, settle_limit)
+		queue = [(work.priority(idx), idx) for idx in work.out]
+		queue.sort()
+		rank, up, down, via = {}, {}, {}, {}
+		while queue:
+			priority, idx = heappop(queue)
+			# lazy update: contract it only if it is still the least important
+			priority = work.priority(idx)
+			if queue and priority > queue[0][0]:
+				heappush(queue, (priority, idx))
+				continue
+			rank[idx] = len(rank)
+			up[idx], down[idx], added = work.contract(idx)
+			for shortcut in added:
+				via[shortcut] = idx
+		return cls(graph, rank, up, down, via)
@@ -0,0 +1,215 @@
+''' DFS, BFS, Dijkstra and A* searches that keep their state in arrays.
+
+The searches in searches.py keep their state in dicts and sets that are made
+again for every query. For a graph with integer node idx values (0..n-1, gaps
+are allowed) these versions keep the cost-so-far, parent and visited state of
+each node in preallocated arrays indexed by the node idx instead.
+
+The arrays are kept (one set per graph) and reused for the next query. Rather
+than clearing them, each query takes a new "generation" number and a node only
+counts as seen (or closed) if it is stamped with the current generation. The
+edges are also copied once into plain lists (CSR form) and copied again only if
+the graph version changes.
+
+The result is the same Path (and the same path) as the matching search in
+searches.py. The route, open and closed details are built from the nodes the
+search touched when it ends. As in searches.py, a target the graph knows
+can't be reached (see SparseGraph.connected and FrozenGraph.connected) fails
+straight away.
+
+Example:
+	path = DENSE_SEARCHES[4](world.graph, 0, 17)
+
+'''
+from array import array
+from heapq import heappush, heappop
+from weakref import WeakKeyDictionary
+from collections import deque
+from searches import Path, _unreachable
+
+
+class DenseState(object):
+	''' Reusable per-node search arrays and a list (CSR) copy of the edges of
+	one graph. '''
+
+	def __init__(self):
+		self.graph = None # the graph (and version) the edges were copied from
+		self.version = None
+		self.size = 0 # largest node idx + 1
+		self.generation = 0
+		self.cost_g = array('d')
+		self.parent = array('q')
+		self.order = array('q') # heap entry number of the live open entry
+		self.mark = array('q') # generation (seen), generation + 1 (closed)
+
+	def load(self, graph):
+		''' Copy the edges of graph (if changed) and start a new generation. '''
+		if graph is not self.graph or graph.version != self.version:
+			self.first, self.targets, self.costs = _edge_lists(graph)
+			self.graph, self.version = graph, graph.version
+			size = len(self.first) - 1
+			if size != self.size:
+				self.size = size
+				self.generation = 0
+				self.cost_g = array('d', bytes(8 * size))
+				self.parent = array('q', bytes(8 * size))
+				self.order = array('q', bytes(8 * size))
+				self.mark = array('q', bytes(8 * size))
+		self.generation += 2
+		return self.generation
+
+	def result(self, graph, touched, target_idx, steps):
+		''' Build the Path for the nodes touched by the current generation. '''
+		seen, parent, mark = self.generation, self.parent, self.mark
+		route = {idx: parent[idx] for idx in touched}
+		open = [idx for idx in touched if mark[idx] == seen]
+		closed = set(idx for idx in touched if mark[idx] != seen)
+		return Path(graph, route, target_idx, open, closed, steps)
+
+
+def _edge_lists(graph):
+	''' Return (first, targets, costs) lists, where the edges leaving node idx
+	are first[idx]:first[idx+1] of targets and costs (sorted by target). '''
+	node_ids = getattr(graph, 'node_ids', False)
+	if node_ids is None: # a dense FrozenGraph, already in this form
+		return graph.offsets.tolist(), graph.targets.tolist(), graph.costs.tolist()
+	if hasattr(graph, 'nodes'):
+		ids = sorted(graph.nodes.keys())
+	else:
+		ids = node_ids.tolist()
+	size = ids[-1] + 1 if ids else 0
+	first, targets, costs = [0] * (size + 1), [], []
+	for idx in ids:
+		for dest in graph.get_neighbours(idx):
+			targets.append(dest)
+			costs.append(graph.get_edge(idx, dest).cost)
+		first[idx + 1] = len(targets)
+	for idx in range(size): # nodes in the gaps have no edges
+		if first[idx + 1] < first[idx]:
+			first[idx + 1] = first[idx]
+	return first, targets, costs
+
+
+_states = WeakKeyDictionary() # graph -> DenseState
+
+def _state(graph):
+	state = _states.get(graph)
+	if state is None:
+		state = _states[graph] = DenseState()
+	return state
+
+
+def _no_path(graph, source_idx, target_idx):
+	''' The failed Path (no steps) for a target that can't be reached, the
+	same as the searches.py searches give. '''
+	return Path(graph, {source_idx: source_idx}, target_idx, [], set(), 0)
+
+def _SearchUnweighted(graph, source_idx, target_idx, limit, lifo):
+	''' DFS (lifo) or BFS, the same as SearchDFS and SearchBFS. '''
+	if _unreachable(graph, source_idx, target_idx):
+		return _no_path(graph, source_idx, target_idx)
+	state = _state(graph)
+	seen = state.load(graph)
+	done = seen + 1
+	first, targets = state.first, state.targets
+	parent, mark = state.parent, state.mark
+	touched = [source_idx]
+	parent[source_idx] = source_idx
+	mark[source_idx] = seen
+	open = deque([source_idx])
+	take = open.pop if lifo else open.popleft
+	steps = 0
+	while open:
+		steps += 1
+		leaf = take()
+		mark[leaf] = done
+		if leaf == target_idx:
+			break
+		for e in range(first[leaf], first[leaf + 1]):
+			dest = targets[e]
+			if mark[dest] < seen: # not open or closed
+				mark[dest] = seen
+				parent[dest] = leaf
+				touched.append(dest)
+				open.append(dest)
+		# stop early?
+		if limit > 0 and steps >= limit:
+			break
+	return state.result(graph, touched, target_idx, steps)
+
+def _SearchWeighted(graph, source_idx, target_idx, limit, heuristic):
+	''' Dijkstra, or A* if heuristic, the same as SearchDijkstra/SearchAStar. '''
+	if _unreachable(graph, source_idx, target_idx):
+		return _no_path(graph, source_idx, target_idx)
+	state = _state(graph)
+	seen = state.load(graph)
+	done = seen + 1
+	first, targets, costs = state.first, state.targets, state.costs
+	cost_g, parent, order, mark = state.cost_g, state.parent, state.order, state.mark
+	cost_h = graph.cost_h if heuristic else None
+	touched = [source_idx]
+	cost_g[source_idx] = 0.0
+	parent[source_idx] = source_idx
+	mark[source_idx] = seen
+	order[source_idx] = 0
+	open = [(cost_h(source_idx, target_idx) if heuristic else 0.0, 0, source_idx)]
+	count = 1 # heap entry numbers, so equal costs pop in FIFO order
+	steps = 0
+	while open:
+		cost_f, n, leaf = heappop(open)
+		if order[leaf] != n: # stale (re-costed or closed) entry
+			continue
+		steps += 1
+		mark[leaf] = done
+		order[leaf] = -1
+		if leaf == target_idx:
+			break
+		cost = cost_g[leaf]
+		for e in range(first[leaf], first[leaf + 1]):
+			dest = targets[e]
+			m = mark[dest]
+			if m == done: # visited
+				continue
+			cost_d = cost + costs[e]
+			if m == seen: # old path to same node, keep it if better
+				if cost_g[dest] <= cost_d:
+					continue
+			else:
+				mark[dest] = seen
+				touched.append(dest)
+			cost_g[dest] = cost_d
+			parent[dest] = leaf
+			order[dest] = count
+			if heuristic:
+				cost_d += cost_h(dest, target_idx)
+			heappush(open, (cost_d, count, dest))
+			count += 1
+		# stop early?
+		if limit > 0 and steps >= limit:
+			break
+	return state.result(graph, touched, target_idx, steps)
+
+
+def DenseSearchDFS(graph, source_idx, target_idx, limit=0):
+	''' Depth First Search, with array state. '''
+	return _SearchUnweighted(graph, source_idx, target_idx, limit, True)
+
+def DenseSearchBFS(graph, source_idx, target_idx, limit=0):
+	''' Breadth First Search, with array state. '''
+	return _SearchUnweighted(graph, source_idx, target_idx, limit, False)
+
+def DenseSearchDijkstra(graph, source_idx, target_idx, limit=0):
+	''' Dijkstra Search, with array state. '''
+	return _SearchWeighted(graph, source_idx, target_idx, limit, False)
+
+def DenseSearchAStar(graph, source_idx, target_idx, limit=0):
+	''' A* Search, with array state. '''
+	return _SearchWeighted(graph, source_idx, target_idx, limit, True)
+
+
+DENSE_SEARCHES = {
+	1: DenseSearchDFS,
+	2: DenseSearchBFS,
+	3: DenseSearchDijkstra,
+	4: DenseSearchAStar
+}
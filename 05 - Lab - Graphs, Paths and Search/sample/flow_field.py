@@ -0,0 +1,126 @@
+''' Flow field (cost-to-target field) for a BoxWorld, computed with numpy.
+
+Instead of one search for each agent, the path cost from *every* box to one
+target box is found at once. Each box then points (flows) to the neighbour box
+that is cheapest to go through, so any number of agents can follow the field
+to the target with one array lookup per step.
+
+The costs use the same rule as the navigation graph: moving from a box of
+type A to a box of type B costs box_types[A]["cost"][B], and types with no
+costs (walls) can not be entered or left.
+
+The field is found by "fast sweeping": the whole grid is swept east, west,
+north and south, each sweep being one numpy operation per row (or column),
+and the sweeps are repeated until nothing changes. Only routes that turn a lot
+(mazes) need many repeats.
+
+'''
+import numpy as np
+
+INF = np.inf
+
+# neighbour directions (dx, dy), in the same order the navgraph adds edges
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+
+class FlowField(object):
+	''' Cost-to-target and flow direction for every box of a world with
+	x_boxes, y_boxes, tile_type(idx) and a navigation graph (graph). '''
+
+	def __init__(self, world, box_types):
+		self.world = world
+		self.kinds = list(box_types.keys())
+		n = len(self.kinds)
+		# cost[a, b] to move from a box of kind a to one of kind b
+		self.kind_cost = np.full((n, n), INF)
+		for a, kind in enumerate(self.kinds):
+			for b, other in enumerate(self.kinds):
+				if other in box_types[kind].get("cost", {}):
+					self.kind_cost[a, b] = box_types[kind]["cost"][other]
+		self.target_idx = None
+		self.graph = None # the world graph (and version) last used
+		self.version = None
+		self.cost = None # array [y, x] of the cost to the target
+		self.next = None # array [idx] of the next box idx toward the target, or -1
+
+	def update(self, target_idx):
+		''' Recompute the field if the target or the world has changed. Returns
+		True if it was recomputed. '''
+		graph = self.world.graph
+		if (target_idx == self.target_idx and graph is self.graph
+				and graph.version == self.version):
+			return False
+		self.target_idx = target_idx
+		self.graph, self.version = graph, graph.version
+		self._compute()
+		return True
+
+	def _compute(self):
+		nx, ny = self.world.x_boxes, self.world.y_boxes
+		codes = {kind: i for i, kind in enumerate(self.kinds)}
+		kinds = np.array([codes[self.world.tile_type(i)] for i in range(nx * ny)])
+		kinds = kinds.reshape(ny, nx)
+		# step[d][y, x] is the cost of moving from (x,y) in direction d
+		step = []
+		for dx, dy in DIRECTIONS:
+			cost = np.full((ny, nx), INF)
+			to_kinds = np.roll(kinds, (-dy, -dx), axis=(0, 1))
+			cost[:] = self.kind_cost[kinds, to_kinds]
+			# no wrapping around the edges of the world
+			if dx == 1: cost[:, -1] = INF
+			if dx == -1: cost[:, 0] = INF
+			if dy == 1: cost[-1, :] = INF
+			if dy == -1: cost[0, :] = INF
+			step.append(cost)
+		up, down, right, left = step
+
+		dist = np.full((ny, nx), INF)
+		tx, ty = self.target_idx % nx, self.target_idx // nx
+		dist[ty, tx] = 0.0
+		while True:
+			before = dist.copy()
+			for x in range(nx - 2, -1, -1): # from the east
+				np.minimum(dist[:, x], right[:, x] + dist[:, x+1], out=dist[:, x])
+			for x in range(1, nx): # from the west
+				np.minimum(dist[:, x], left[:, x] + dist[:, x-1], out=dist[:, x])
+			for y in range(ny - 2, -1, -1): # from the north
+				np.minimum(dist[y], up[y] + dist[y+1], out=dist[y])
+			for y in range(1, ny): # from the south
+				np.minimum(dist[y], down[y] + dist[y-1], out=dist[y])
+			if np.array_equal(before, dist):
+				break
+		self.cost = dist
+
+		# flow to the neighbour with the lowest step + remaining cost
+		via = np.full((len(DIRECTIONS), ny, nx), INF)
+		for d, (dx, dy) in enumerate(DIRECTIONS):
+			via[d] = step[d] + np.roll(dist, (-dy, -dx), axis=(0, 1))
+		best = via.argmin(axis=0)
+		deltas = np.array([dx + dy * nx for dx, dy in DIRECTIONS])
+		idxs = np.arange(nx * ny).reshape(ny, nx)
+		nxt = idxs + deltas[best]
+		stuck = ~np.isfinite(via.min(axis=0)) | ~np.isfinite(dist)
+		nxt[stuck] = -1
+		nxt[ty, tx] = -1
+		self.next = nxt.ravel()
+
+	def cost_to_target(self, idx):
+		''' The path cost from box idx to the target (inf if unreachable). '''
+		nx = self.world.x_boxes
+		return float(self.cost[idx // nx, idx % nx])
+
+	def next_box(self, idx):
+		''' The box idx to step to from box idx, or -1 at (or with no route
+		to) the target. Also works for a numpy array of box idx values. '''
+		if isinstance(idx, np.ndarray):
+			return self.next[idx]
+		return int(self.next[idx])
+
+	def path(self, idx):
+		''' The list of box idx values from idx to the target ([] if no route). '''
+		if not np.isfinite(self.cost_to_target(idx)):
+			return []
+		result = [idx]
+		while result[-1] != self.target_idx:
+			result.append(int(self.next[result[-1]]))
+		return result
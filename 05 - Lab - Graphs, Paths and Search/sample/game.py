@@ -2,7 +2,10 @@ game = None
 
 from enum import Enum
 import pyglet
+import searches
 from box_world import BoxWorld, search_modes
+from box_view import BoxWorldView
+from path_service import PathService
 from graphics import window
 
 # Mouse mode indicates what the mouse "click" should do...
@@ -19,10 +22,18 @@ class SearchModes(Enum):
 		BFS = 		2
 		Dijkstra = 	3
 		AStar = 	4
+		BiDijkstra = 5
+		BiAStar = 	6
+		JPS = 		7
+		HPAStar = 	8
+		LPAStar = 	9
+		ARAStar = 	10
+		IDAStar = 	11
 
 class Game():
 	def __init__(self, map):
 		self.world = BoxWorld.FromFile(map)
+		self.view = BoxWorldView(self.world, window.width, window.height)
 		# Mouse mode indicates what the mouse "click" should do...
 		self.mouse_mode = MouseModes.MUD
 		window._update_label('mouse', 'Click to place: '+self.mouse_mode.name)
@@ -33,22 +44,29 @@ class Game():
 		# search limit
 		self.search_limit = 0 # unlimited.
 		window._update_label('status', 'Status: Loaded')
+		# full searches run in the background, so the window keeps drawing
+		self.service = PathService()
+		pyglet.clock.schedule_interval(self.service.poll, 1/60.0)
 
 	
 	def plan_path(self):
-		self.world.plan_path(self.search_mode, self.search_limit)
+		if self.world.request_path(self.service, self.search_mode, self.search_limit, self.path_planned):
+			window._update_label('status', 'Status: Planning...')
+
+	def path_planned(self):
 		window._update_label('status', 'Status: Path Planned')
 
 	def input_mouse(self, x, y, button, modifiers):
-		box = self.world.get_box_by_pos(x,y)
+		box = self.view.get_box_by_pos(x,y)
 		if box:
 			if self.mouse_mode == MouseModes.START:
-				self.world.set_start(box.node.idx)
+				self.world.set_start(box.index)
 			elif self.mouse_mode == MouseModes.TARGET:
-				self.world.set_target(box.node.idx)
+				self.world.set_target(box.index)
 			else:
-				box.set_type(self.mouse_mode.name)
-			self.world.reset_navgraph()
+				with self.service.lock: # (not while a search is using the graph)
+					# (only the edges of the changed box are updated)
+					self.world.set_type(box.index, self.mouse_mode.name)
 			self.plan_path()
 			window._update_label('status','Status: Graph Changed')
 
@@ -63,27 +81,32 @@ class Game():
 			self.search_mode += 1
 			if self.search_mode > len(search_modes):
 				self.search_mode = 1
-			self.world.plan_path(self.search_mode, self.search_limit)
+			self.plan_path()
 			window._update_label('search', 'Search Type: '+SearchModes(self.search_mode).name)
 		elif symbol == pyglet.window.key.N:
 			self.search_mode -= 1
 			if self.search_mode <= 0:
 				self.search_mode = len(search_modes)
-			self.world.plan_path(self.search_mode, self.search_limit)
+			self.plan_path()
 			window._update_label('search', 'Search Type: '+SearchModes(self.search_mode).name)
 		# Plan a path using the current search mode?
 		elif symbol == pyglet.window.key.SPACE:
-			self.world.plan_path(self.search_mode, self.search_limit)
+			self.plan_path()
 		elif symbol == pyglet.window.key.UP:
 			self.search_limit += 1
 			window._update_label('status', 'Status: limit=%d' % self.search_limit)
-			self.world.plan_path(self.search_mode, self.search_limit)
+			self.plan_path()
 		elif symbol == pyglet.window.key.DOWN:
 			if self.search_limit-1 > 0:
 				self.search_limit -= 1
 				window._update_label('status', 'Status: limit=%d' % self.search_limit)
-				self.world.plan_path(self.search_mode, self.search_limit)
+				self.plan_path()
 		elif symbol == pyglet.window.key._0:
 			self.search_limit = 0
 			window._update_label('status', 'Status: limit=%d' % self.search_limit)
-			self.world.plan_path(self.search_mode, self.search_limit)
\ No newline at end of file
+			self.plan_path()
+		# Collect (and print) search stats?
+		elif symbol == pyglet.window.key.I:
+			searches.STATS = not searches.STATS
+			window._update_label('status', 'Status: stats=%s' % searches.STATS)
+			self.plan_path()
\ No newline at end of file
@@ -8,6 +8,13 @@ For class use only. Do not publically share or post this code without
 permission.
 
 '''
+import struct
+from collections import deque
+try:
+    import numpy as np
+except ImportError: # only FrozenGraph needs numpy
+    np = None
+
 
 class Edge(object):
     '''A single weighted (has a cost) and directed (has direction) edge. '''
@@ -33,9 +40,19 @@ class SparseGraph(object):
     def __init__(self, digraph=True):
         self.nodes = {} # dictionary
         self.edgelist = {} # dictionary of dictionaries
+        self.in_edgelist = {} # the same edges, keyed by to_idx then from_idx
         self.digraph = digraph
         self.next_node_idx = 0
         self.cost_h = None # heuristic cost function reference
+        self.version = 0 # increased by every change to the nodes or edges
+        self.edge_count = 0 # number of (directed) edges in edgelist
+        # connected components (ignoring edge direction), brought up to date
+        # by the next query after any edges are removed (see _relabel)
+        self.labels = {} # dict of {idx: component label}
+        self.members = {} # dict of {label: set of idx}
+        self.next_label = 0
+        self._cut = [] # sets of nodes that lost links, to check on the next query
+        self._strong = (None, None) # (version, labels) of strong_components
 
     def is_empty(self):
         ''' Return True if graph contains no nodes '''
@@ -69,6 +86,12 @@ class SparseGraph(object):
         keys.sort() # in-place
         return keys
 
+    def get_predecessors(self, node_idx):
+        ''' Return a list of the nodes (idx values) with an edge to this node. '''
+        keys = list(self.in_edgelist[node_idx].keys())
+        keys.sort() # in-place
+        return keys
+
     def add_node(self, node):
         ''' Add new node and assign it the current next_node_idx. '''
         # It is possible to "jump" index values and leave gaps in the sequence.
@@ -76,40 +99,91 @@ class SparseGraph(object):
             node.idx = self.next_node_idx
         self.next_node_idx = node.idx + 1
         # Keep the node, prepare the edgelist for edges
+        if node.idx in self.edgelist: # replaced, so drop its old edges out
+            dropped = self.edgelist[node.idx]
+            for to_idx in dropped:
+                del self.in_edgelist[to_idx][node.idx]
+            self.edge_count -= len(dropped)
+        else:
+            dropped = {}
+            self.in_edgelist[node.idx] = {}
+            self._new_component([node.idx])
         self.nodes[node.idx] = node
         self.edgelist[node.idx] = {}
+        self.version += 1
+        if dropped:
+            self._unlinked([node.idx, *dropped])
         # It can be useful to return the node just added...
         return node
 
     def remove_node(self, idx):
-        ''' remove this node, and any edges to/from other nodes '''
+        ''' remove this node, and any edges to/from other nodes. Only the edges
+        of this node are visited (using the incoming edge index). '''
         del self.nodes[idx]
+        self.version += 1
         if idx in self.edgelist:
+            for to_idx in self.edgelist[idx]:
+                if to_idx != idx:
+                    del self.in_edgelist[to_idx][idx]
+            for from_idx in self.in_edgelist[idx]:
+                if from_idx != idx:
+                    del self.edgelist[from_idx][idx]
+            self.edge_count -= len(self.edgelist[idx]) + len(self.in_edgelist[idx])
+            if idx in self.edgelist[idx]: # a loop, counted twice
+                self.edge_count += 1
+            linked = set(self.edgelist[idx]) | set(self.in_edgelist[idx])
+            linked.discard(idx)
             del self.edgelist[idx]
-        for from_idx, list in self.edgelist.items():
-            if idx in list:
-                del self.edgelist[from_idx][idx]
+            del self.in_edgelist[idx]
+            # the nodes it linked may now be apart
+            label = self.labels.pop(idx)
+            self.members[label].discard(idx)
+            if not self.members[label]:
+                del self.members[label]
+            cut = [idxs for idxs in self._cut if idx not in idxs]
+            for idxs in self._cut: # checks with it are joined, with its links instead
+                if idx in idxs:
+                    linked |= idxs - {idx}
+            self._cut = cut
+            self._unlinked(linked)
 
     def add_edge(self, edge):
         ''' Adds edge to the graph. Ensures that the nodes are valid.
         If not a digraph then create back edge to match. '''
 
         assert (edge.from_idx in self.nodes and edge.to_idx in self.nodes), 'invalid node idx'
+        if self.labels[edge.from_idx] != self.labels[edge.to_idx]:
+            self._relabel() # cuts are checked before components are joined
+        self.version += 1
+        if edge.to_idx not in self.edgelist[edge.from_idx]:
+            self.edge_count += 1
         self.edgelist[edge.from_idx][edge.to_idx] = edge
+        self.in_edgelist[edge.to_idx][edge.from_idx] = edge
 
         if not self.digraph:
             opp = Edge(edge.to_idx, edge.from_idx, edge.cost)
+            if opp.to_idx not in self.edgelist[opp.from_idx]:
+                self.edge_count += 1
             self.edgelist[opp.from_idx][opp.to_idx] = opp
+            self.in_edgelist[opp.to_idx][opp.from_idx] = opp
+        self._linked(edge.from_idx, edge.to_idx)
 
     def remove_edge(self, from_idx, to_idx):
         ''' Remove edge. If not a digraph remove back edge also'''
+        self.version += 1
         if from_idx in self.edgelist:
             if to_idx in self.edgelist[from_idx]:
                 del self.edgelist[from_idx][to_idx]
+                del self.in_edgelist[to_idx][from_idx]
+                self.edge_count -= 1
         if not self.digraph:
             if to_idx in self.edgelist:
                 if from_idx in self.edgelist[to_idx]:
                     del self.edgelist[to_idx][from_idx]
+                    del self.in_edgelist[from_idx][to_idx]
+                    self.edge_count -= 1
+        if from_idx in self.nodes and to_idx in self.nodes:
+            self._unlinked((from_idx, to_idx))
 
     def num_nodes(self):
         ''' return the number of nodes (active+inactive) '''
@@ -117,13 +191,19 @@ class SparseGraph(object):
 
     def num_edges(self):
         ''' return the total number of edges in the graph '''
-        return sum([ len(el) for id, el in list(self.edgelist.items()) ])
+        return self.edge_count
 
     def clear(self):
         ''' clears the graph ready for new nodes and edges '''
         self.next_node_idx = 0
+        self.version += 1
+        self.edge_count = 0
         self.nodes = {}
         self.edgelist = {}
+        self.in_edgelist = {}
+        self.labels = {}
+        self.members = {}
+        self._cut = []
 
     def path_cost(self, path):
         '''Return the cost of travelling on each node in the path list.'''
@@ -132,6 +212,166 @@ class SparseGraph(object):
             result += self.get_edge(i, j).cost
         return result
 
+    def component(self, idx):
+        ''' Return the label of the connected component (nodes joined by edges
+        in either direction) of node idx. '''
+        self._relabel()
+        return self.labels[idx]
+
+    def connected(self, idx1, idx2):
+        ''' Return False if there is no path between the two nodes, in either
+        direction. For a digraph True does not mean there is a path (see
+        strong_components), for an undirected graph it does. '''
+        self._relabel()
+        return self.labels[idx1] == self.labels[idx2]
+
+    def num_components(self):
+        self._relabel()
+        return len(self.members)
+
+    def _new_component(self, idxs):
+        label = self.next_label
+        self.next_label += 1
+        self.members[label] = set(idxs)
+        for idx in idxs:
+            self.labels[idx] = label
+
+    def _linked(self, idx1, idx2):
+        ''' Join the components of two nodes (now linked by an edge). The
+        smaller component takes the label of the larger. '''
+        keep, drop = self.labels[idx1], self.labels[idx2]
+        if keep == drop:
+            return
+        if len(self.members[keep]) < len(self.members[drop]):
+            keep, drop = drop, keep
+        moved = self.members.pop(drop)
+        for idx in moved:
+            self.labels[idx] = keep
+        self.members[keep] |= moved
+
+    def _unlinked(self, idxs):
+        ''' Edges between the nodes idxs have gone. They are checked (and
+        relabelled if they are now apart) on the next component query, so
+        edits cost nothing until then. '''
+        if self._cut and not self._cut[-1].isdisjoint(idxs): # the same edit
+            self._cut[-1].update(idxs)
+        elif len(idxs) > 1:
+            self._cut.append(set(idxs))
+
+    def _relabel(self):
+        ''' Check the nodes that lost links (see _unlinked) are still
+        connected. The nodes of each edit are checked on their own, which is
+        quick as they are close. If a part cut off has nodes of two edits,
+        the parts left may be apart too, so all the nodes are checked again
+        together. '''
+        cut, self._cut = self._cut, []
+        first = self.next_label # labels from here are parts cut off now
+        for idxs in cut:
+            self._check(idxs)
+        edits = {} # dict of {label: edit} of the parts cut off
+        for edit, idxs in enumerate(cut):
+            for idx in idxs:
+                label = self.labels[idx]
+                if label >= first and edits.setdefault(label, edit) != edit:
+                    self._check(set().union(*cut))
+                    return
+
+    def _check(self, idxs):
+        ''' Split the components of nodes idxs (see _split). '''
+        by_label = {}
+        for idx in sorted(idxs):
+            by_label.setdefault(self.labels[idx], []).append(idx)
+        for label, idxs in by_label.items():
+            if len(idxs) > 1:
+                self._split(label, idxs)
+
+    def _split(self, label, idxs):
+        ''' Give each part of component label that is no longer connected a
+        label of its own. A search is made out from each of idxs, a step each
+        in turn. Searches that meet are joined, and one that runs out of nodes
+        to visit is a component of its own. When one search is left it keeps
+        the label, so the cost is about the size of the smaller parts (or the
+        detours between the nodes). '''
+        owner = {idx: idx for idx in idxs} # dict of {idx: search that saw it}
+        joined = {} # dict of {search: search it was joined to}
+        queues = {idx: deque([idx]) for idx in idxs}
+        seen = {idx: [idx] for idx in idxs}
+        def find(search):
+            while search in joined:
+                search = joined[search]
+            return search
+        while len(queues) > 1:
+            for search in list(queues):
+                if len(queues) == 1:
+                    break
+                if search not in queues: # joined to another this round
+                    continue
+                queue = queues[search]
+                if not queue: # nothing left, so it is cut off
+                    del queues[search]
+                    self.members[label] -= set(seen[search])
+                    self._new_component(seen.pop(search))
+                    continue
+                leaf = queue.popleft()
+                for idx in (*self.edgelist[leaf], *self.in_edgelist[leaf]):
+                    if idx not in owner:
+                        owner[idx] = search
+                        seen[search].append(idx)
+                        queue.append(idx)
+                        continue
+                    other = find(owner[idx])
+                    if other != search: # they meet, so join them (into the bigger)
+                        if len(seen[other]) > len(seen[search]):
+                            seen[search], seen[other] = seen[other], seen[search]
+                            queues[search], queues[other] = queues[other], queues[search]
+                            queue = queues[search]
+                        joined[other] = search
+                        queue.extend(queues.pop(other))
+                        seen[search].extend(seen.pop(other))
+
+    def strong_components(self):
+        ''' Return a dict of {idx: label} of the strongly connected components
+        (there is a path both ways between any two nodes of one). There is a
+        path from idx1 to idx2 if they have the same label, but for different
+        labels there may still be a path (one way). Found (with Tarjan's
+        algorithm) the first time it is asked for after the graph changes. '''
+        version, labels = self._strong
+        if version == self.version:
+            return labels
+        labels, index, low = {}, {}, {}
+        stack, on_stack = [], set()
+        for root in self.nodes:
+            if root in index:
+                continue
+            # depth first, with a stack of (node, iterator of its neighbours)
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.edgelist[root]))]
+            while work:
+                idx, neighbours = work[-1]
+                for to_idx in neighbours:
+                    if to_idx not in index:
+                        index[to_idx] = low[to_idx] = len(index)
+                        stack.append(to_idx)
+                        on_stack.add(to_idx)
+                        work.append((to_idx, iter(self.edgelist[to_idx])))
+                        break
+                    elif to_idx in on_stack and index[to_idx] < low[idx]:
+                        low[idx] = index[to_idx]
+                else:
+                    work.pop()
+                    if work and low[idx] < low[work[-1][0]]:
+                        low[work[-1][0]] = low[idx]
+                    if low[idx] == index[idx]: # the root of a component
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            labels[member] = idx
+                            if member == idx:
+                                break
+        self._strong = (self.version, labels)
+        return labels
 
     def summary(self):
         return 'n:%d e:%d (digraph:%d)' % (self.num_nodes(), self.num_edges(), self.digraph)
@@ -163,6 +403,271 @@ class SparseGraph(object):
                 g.add_edge(Edge(from_idx, to_idx))
         return g
 
+    def freeze(self):
+        ''' Return a compact read-only FrozenGraph copy of this graph. '''
+        return FrozenGraph.FromSparseGraph(self)
+
+    def save(self, filename):
+        ''' Save the graph in the binary FrozenGraph file format. Load it with
+        FrozenGraph.FromFile (it loads as a read-only FrozenGraph). '''
+        self.freeze().save(filename)
+
+
+# Binary file: a 64 byte header, then each array (offsets, targets, costs and,
+# if the idx values are not 0..n-1, node_ids) starting on a 64 byte boundary.
+# header: magic, format version, flags (1 digraph, 2 node_ids), nodes, edges,
+# and the numpy dtype strings of the offsets, targets and costs arrays.
+_FILE_MAGIC = b'AI4GCSR\0'
+_FILE_HEADER = struct.Struct('<8sIIQQ8s8s8s')
+_FILE_ALIGN = 64
+
+def _node_ids(graph):
+    ''' sorted list of the node idx values of either kind of graph '''
+    if hasattr(graph, 'nodes'):
+        return sorted(graph.nodes.keys())
+    if graph.node_ids is None:
+        return list(range(graph.num_nodes()))
+    return graph.node_ids.tolist()
+
+
+def _aligned(pos):
+    return (pos + _FILE_ALIGN - 1) // _FILE_ALIGN * _FILE_ALIGN
+
+
+class FrozenGraph(object):
+    '''A read-only graph packed into contiguous compressed sparse row (CSR)
+    arrays. The edges leaving the node stored in row r are the entries
+    offsets[r]:offsets[r+1] of targets (to node idx values, sorted) and costs.
+
+    Node idx values are kept in node_ids (sorted). When they are exactly
+    0..n-1 the row of a node is its idx, otherwise a binary search is used.
+
+    Provides the same query methods as SparseGraph that the searches use, so
+    it can be searched in place of the graph it was frozen from.
+    '''
+
+    def __init__(self, offsets, targets, costs, node_ids=None, digraph=True):
+        assert np is not None, 'FrozenGraph requires numpy'
+        self.offsets = offsets
+        self.targets = targets
+        self.costs = costs
+        n = len(offsets) - 1
+        if node_ids is None or (len(node_ids) == n and (n == 0 or
+                (node_ids[0] == 0 and node_ids[-1] == n - 1))):
+            node_ids = None # dense 0..n-1, the row is the idx
+        self.node_ids = node_ids
+        self.digraph = digraph
+        self.cost_h = None # heuristic cost function reference
+        self.version = 0 # never changes (read-only)
+        self._reverse = None # (offsets, sources) CSR of incoming edges
+        self._labels = None # list of the component label of each row
+
+    def _row(self, idx):
+        ''' Return the CSR row of the node idx, or -1 if there is no node. '''
+        if self.node_ids is None:
+            return idx if 0 <= idx < len(self.offsets) - 1 else -1
+        r = int(np.searchsorted(self.node_ids, idx))
+        if r < len(self.node_ids) and self.node_ids[r] == idx:
+            return r
+        return -1
+
+    def _find(self, from_idx, to_idx):
+        ''' Return the position of the edge in targets/costs, or -1. '''
+        r = self._row(from_idx)
+        if r < 0:
+            return -1
+        lo, hi = int(self.offsets[r]), int(self.offsets[r+1])
+        i = lo + int(np.searchsorted(self.targets[lo:hi], to_idx))
+        if i < hi and self.targets[i] == to_idx:
+            return i
+        return -1
+
+    def is_empty(self):
+        ''' Return True if graph contains no nodes '''
+        return self.num_nodes() == 0
+
+    def is_node(self, idx):
+        ''' Returns True if a node with the given idx is in the graph '''
+        return self._row(idx) >= 0
+
+    def is_edge(self, from_idx, to_idx):
+        ''' Return True if edge exists '''
+        return self._find(from_idx, to_idx) >= 0
+
+    def get_node(self, idx):
+        ''' Return a (new) Node that matches the given index (idx) value.'''
+        if self._row(idx) < 0:
+            raise KeyError(idx)
+        return Node(idx)
+
+    def get_edge(self, from_idx, to_idx):
+        ''' Return a (new) Edge that joins the two nodes specified as indexes.
+        Returns None if there is no edge. '''
+        i = self._find(from_idx, to_idx)
+        if i < 0:
+            return None
+        return Edge(from_idx, to_idx, float(self.costs[i]))
+
+    def get_neighbours(self, node_idx):
+        ''' Return a list of the linked nodes as idx (index) values. '''
+        r = self._row(node_idx)
+        if r < 0:
+            raise KeyError(node_idx)
+        return self.targets[self.offsets[r]:self.offsets[r+1]].tolist()
+
+    def get_predecessors(self, node_idx):
+        ''' Return a list of the nodes (idx values) with an edge to this node.
+        The incoming edge arrays are built the first time they are needed. '''
+        r = self._row(node_idx)
+        if r < 0:
+            raise KeyError(node_idx)
+        if self._reverse is None:
+            n = self.num_nodes()
+            ids = np.arange(n) if self.node_ids is None else self.node_ids
+            sources = np.repeat(ids, np.diff(self.offsets))
+            rows = self.targets if self.node_ids is None else \
+                np.searchsorted(self.node_ids, self.targets)
+            order = np.lexsort((sources, rows))
+            offsets = np.zeros(n + 1, dtype=self.offsets.dtype)
+            np.cumsum(np.bincount(rows, minlength=n), out=offsets[1:])
+            self._reverse = (offsets, sources[order].astype(self.targets.dtype))
+        offsets, sources = self._reverse
+        return sources[offsets[r]:offsets[r+1]].tolist()
+
+    def component(self, idx):
+        ''' Return the label of the connected component (nodes joined by edges
+        in either direction) of node idx. '''
+        r = self._row(idx)
+        if r < 0:
+            raise KeyError(idx)
+        return self._components()[r]
+
+    def connected(self, idx1, idx2):
+        ''' Return False if there is no path between the two nodes, in either
+        direction (see SparseGraph.connected). '''
+        return self.component(idx1) == self.component(idx2)
+
+    def num_components(self):
+        return len(set(self._components()))
+
+    def _components(self):
+        ''' Return the component label of each row, found (with union-find
+        over every edge) the first time they are needed. '''
+        if self._labels is None:
+            n = self.num_nodes()
+            label = list(range(n)) # each row points to a lower row, or itself
+            sources = np.repeat(np.arange(n), np.diff(self.offsets)).tolist()
+            rows = self.targets if self.node_ids is None else \
+                np.searchsorted(self.node_ids, self.targets)
+            for a, b in zip(sources, rows.tolist()):
+                while label[a] != a:
+                    label[a] = a = label[label[a]]
+                while label[b] != b:
+                    label[b] = b = label[label[b]]
+                if a != b:
+                    label[max(a, b)] = min(a, b)
+            for r in range(n): # lower rows are done first
+                label[r] = label[label[r]]
+            self._labels = label
+        return self._labels
+
+    def num_nodes(self):
+        ''' return the number of nodes '''
+        return len(self.offsets) - 1
+
+    def num_edges(self):
+        ''' return the total number of edges in the graph '''
+        return int(self.offsets[-1])
+
+    def nbytes(self):
+        ''' return the number of bytes used by the CSR arrays '''
+        total = self.offsets.nbytes + self.targets.nbytes + self.costs.nbytes
+        if self.node_ids is not None:
+            total += self.node_ids.nbytes
+        return total
+
+    def bytes_per_edge(self):
+        ''' return the array storage cost averaged over each (directed) edge '''
+        return self.nbytes() / max(self.num_edges(), 1)
+
+    def path_cost(self, path):
+        '''Return the cost of travelling on each node in the path list.'''
+        result = 0
+        for i,j in zip(path[:-1], path[1:]):
+            result += self.get_edge(i, j).cost
+        return result
+
+    def summary(self):
+        return 'n:%d e:%d (digraph:%d) %.1f bytes/edge' % (
+            self.num_nodes(), self.num_edges(), self.digraph, self.bytes_per_edge())
+
+    @classmethod
+    def FromSparseGraph(cls, graph):
+        ''' Pack the nodes and edges of a SparseGraph into CSR arrays. The
+        heuristic cost function (cost_h) is kept. '''
+        ids = sorted(graph.nodes.keys())
+        n = len(ids)
+        id_type = np.int32 if (not ids or ids[-1] < 2**31) else np.int64
+        counts = [len(graph.edgelist[idx]) for idx in ids]
+        m = sum(counts)
+        offsets = np.zeros(n + 1, dtype=np.int32 if m < 2**31 else np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        targets = np.empty(int(offsets[-1]), dtype=id_type)
+        costs = np.empty(int(offsets[-1]), dtype=np.float32)
+        for r, idx in enumerate(ids):
+            edges = graph.edgelist[idx]
+            lo = offsets[r]
+            for i, to_idx in enumerate(sorted(edges.keys())):
+                targets[lo+i] = to_idx
+                costs[lo+i] = edges[to_idx].cost
+        g = cls(offsets, targets, costs, np.array(ids, dtype=id_type), graph.digraph)
+        g.cost_h = graph.cost_h
+        return g
+
+    def save(self, filename):
+        ''' Write the graph to a binary file (header plus the CSR arrays) that
+        FromFile can map straight back in to memory. '''
+        arrays = [self.offsets, self.targets, self.costs]
+        if self.node_ids is not None:
+            arrays.append(np.asarray(self.node_ids, dtype=self.targets.dtype))
+        flags = (1 if self.digraph else 0) | (2 if self.node_ids is not None else 0)
+        header = _FILE_HEADER.pack(_FILE_MAGIC, 1, flags, self.num_nodes(),
+            self.num_edges(), *[a.dtype.str.encode() for a in arrays[:3]])
+        with open(filename, 'wb') as f:
+            f.write(header)
+            for a in arrays:
+                f.write(bytes(_aligned(f.tell()) - f.tell()))
+                f.write(np.ascontiguousarray(a).tobytes())
+
+    @classmethod
+    def FromFile(cls, filename, mmap=True):
+        ''' Load a graph written by save(). With mmap (the default) the arrays
+        are mapped read-only from the file rather than read, so loading is
+        near instant and processes loading the same file share the memory.
+        The heuristic cost function (cost_h) is not saved, so set it again. '''
+        with open(filename, 'rb') as f:
+            header = f.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            raise ValueError('%s is not a graph file' % filename)
+        magic, version, flags, n, m, *types = _FILE_HEADER.unpack(header)
+        if magic != _FILE_MAGIC or version != 1:
+            raise ValueError('%s is not a graph file' % filename)
+        types = [np.dtype(t.rstrip(b'\0').decode()) for t in types]
+        shapes = [(n + 1, types[0]), (m, types[1]), (m, types[2])]
+        if flags & 2:
+            shapes.append((n, types[1]))
+        arrays, pos = [], _FILE_HEADER.size
+        for count, dtype in shapes:
+            pos = _aligned(pos)
+            if mmap and count:
+                a = np.memmap(filename, dtype=dtype, mode='r', offset=pos, shape=(count,))
+            else:
+                a = np.fromfile(filename, dtype=dtype, count=count, offset=pos)
+            arrays.append(a)
+            pos += count * dtype.itemsize
+        node_ids = arrays[3] if flags & 2 else None
+        return cls(arrays[0], arrays[1], arrays[2], node_ids, bool(flags & 1))
+
 
 #==============================================================================
 # If this file is run directly, it will test the basic Node, Edge and
@@ -189,7 +694,7 @@ if __name__ == '__main__':
     g.remove_node(0)
     print(g.summary(), g.is_edge(1,2), g.is_node(0), g.is_node(1))
     g.remove_edge(1, 2)
-    print(g.summary(), g.is_edge(1,2))
+    print(g.summary(), g.is_edge(1,2), g.connected(1,2), g.num_components())
     # sample graph from book
     adj_list = ((0,3,5),
                 (1,3,4),
@@ -200,4 +705,14 @@ if __name__ == '__main__':
                 (6,4))
     g = SparseGraph.FromAdjacencyList(adj_list, False)
     print(g.summary())
-    print(g.get_adj_list_str())
\ No newline at end of file
+    print(g.get_adj_list_str())
+    # pack it into a read-only CSR graph
+    if np is not None:
+        fg = g.freeze()
+        print(fg.summary())
+        print(fg.get_neighbours(3), fg.get_edge(3, 1).cost, fg.is_edge(5, 1))
+        # and save / map it back in from a binary file
+        import os, tempfile
+        filename = os.path.join(tempfile.gettempdir(), 'graph_test.csr')
+        fg.save(filename)
+        print(FrozenGraph.FromFile(filename).summary())
\ No newline at end of file
@@ -0,0 +1,141 @@
+''' Landmark (ALT) heuristic for A* searches of a SparseGraph or FrozenGraph.
+
+A few "landmark" nodes are picked (each as far as possible from the ones
+before) and the exact path cost from each landmark to every node, and from
+every node to each landmark, is found with Dijkstra. By the triangle
+inequality, for any landmark L
+
+	cost(u, t) >= cost(L, t) - cost(L, u)
+	cost(u, t) >= cost(u, L) - cost(t, L)
+
+so the largest of these is a heuristic that never overestimates and is
+consistent. Unlike a straight line (geometric) heuristic it knows about walls
+and expensive (mud, water) boxes.
+
+The distance tables are numpy arrays, and can be saved to (and loaded from) a
+file so the Dijkstra work is done once for each map.
+
+Example:
+	lm = Landmarks.Cached(graph, 'map1.landmarks.npz')
+	lm.install(graph)   # graph.cost_h is now the ALT heuristic
+
+'''
+import os
+import zipfile
+import numpy as np
+from graph import _node_ids
+from searches import _costs_from
+
+INF = float('inf')
+
+
+def _fingerprint(graph, node_ids):
+	''' (edge count, total edge cost) - to spot tables saved for another map '''
+	total = 0.0
+	for idx in node_ids:
+		for dest in graph.get_neighbours(idx):
+			total += graph.get_edge(idx, dest).cost
+	return np.array([graph.num_edges(), total])
+
+
+class Landmarks(object):
+	''' Landmark distance tables for a graph, and the ALT heuristic. '''
+
+	def __init__(self, node_ids, landmarks, cost_from, cost_to, fingerprint=None):
+		self.node_ids = list(node_ids)
+		self.landmarks = list(landmarks)
+		self.cost_from = cost_from # array [landmark, row] of cost(landmark, node)
+		self.cost_to = cost_to # array [landmark, row] of cost(node, landmark)
+		self.fingerprint = fingerprint
+		dense = self.node_ids == list(range(len(self.node_ids)))
+		self.rows = None if dense else {idx: r for r, idx in enumerate(self.node_ids)}
+		# every node reaches (and is reached from) every landmark?
+		self.complete = bool(np.isfinite(cost_from).all() and np.isfinite(cost_to).all())
+
+	def _row(self, idx):
+		return idx if self.rows is None else self.rows[idx]
+
+	def cost_h(self, idx1, idx2):
+		''' ALT heuristic estimate of the path cost from idx1 to idx2. '''
+		if not self.landmarks:
+			return 0.0
+		r1, r2 = self._row(idx1), self._row(idx2)
+		if self.complete:
+			return max(float((self.cost_from[:, r2] - self.cost_from[:, r1]).max()),
+				float((self.cost_to[:, r1] - self.cost_to[:, r2]).max()), 0.0)
+		with np.errstate(invalid='ignore'):
+			bounds = np.concatenate((
+				self.cost_from[:, r2] - self.cost_from[:, r1],
+				self.cost_to[:, r1] - self.cost_to[:, r2]))
+		# unreachable (infinite) table entries give no usable bound
+		bounds = bounds[np.isfinite(bounds)]
+		return max(float(bounds.max()), 0.0) if len(bounds) else 0.0
+
+	def install(self, graph):
+		''' Set this as the heuristic (cost_h) of the graph. '''
+		graph.cost_h = self.cost_h
+
+	def save(self, filename):
+		''' Save the tables to a numpy .npz file. '''
+		with open(filename, 'wb') as f: # (so numpy doesn't add .npz to the name)
+			np.savez(f, node_ids=np.array(self.node_ids),
+				landmarks=np.array(self.landmarks), cost_from=self.cost_from,
+				cost_to=self.cost_to, fingerprint=self.fingerprint)
+
+	@classmethod
+	def FromGraph(cls, graph, k=8, first=None):
+		''' Choose k landmarks and find their costs to/from every node. The
+		first landmark is the node furthest from first (default lowest idx),
+		each next one is the node furthest from all of those already chosen. '''
+		node_ids = _node_ids(graph)
+		rows = {idx: r for r, idx in enumerate(node_ids)}
+		n = len(node_ids)
+		k = min(k, n)
+		cost_from = np.full((k, n), INF, dtype=np.float32)
+		cost_to = np.full((k, n), INF, dtype=np.float32)
+		def table(costs, out):
+			for idx, cost in costs[0].items():
+				out[rows[idx]] = cost
+		# how far each node is from the nearest chosen landmark (or first)
+		nearest = np.full(n, INF)
+		table(_costs_from(graph, node_ids[0] if first is None else first), nearest)
+		landmarks = []
+		for i in range(k):
+			far = np.where(np.isfinite(nearest), nearest, -1.0)
+			far[[rows[idx] for idx in landmarks]] = -1.0
+			idx = node_ids[int(far.argmax())]
+			landmarks.append(idx)
+			table(_costs_from(graph, idx), cost_from[i])
+			if graph.digraph:
+				table(_costs_from(graph, idx, reverse=True), cost_to[i])
+			else:
+				cost_to[i] = cost_from[i]
+			nearest = np.minimum(nearest if i else INF, cost_from[i])
+		return cls(node_ids, landmarks, cost_from, cost_to, _fingerprint(graph, node_ids))
+
+	@classmethod
+	def FromFile(cls, filename, graph=None):
+		''' Load tables saved by save(). If a graph is given, raises ValueError
+		if the tables were not made for a graph with the same nodes and edges. '''
+		with np.load(filename) as data:
+			lm = cls(data['node_ids'].tolist(), data['landmarks'].tolist(),
+				data['cost_from'], data['cost_to'], data['fingerprint'])
+		if graph is not None:
+			node_ids = _node_ids(graph)
+			if node_ids != lm.node_ids or not np.allclose(lm.fingerprint, _fingerprint(graph, node_ids)):
+				raise ValueError('landmark file %s does not match the graph' % filename)
+		return lm
+
+	@classmethod
+	def Cached(cls, graph, filename, k=8):
+		''' Load the tables from filename if they match the graph, otherwise
+		(or if the file can't be read) build them and save them there for next
+		time. '''
+		if os.path.exists(filename):
+			try:
+				return cls.FromFile(filename, graph)
+			except (ValueError, KeyError, OSError, zipfile.BadZipFile):
+				pass # not for this graph, or a truncated/corrupt file
+		lm = cls.FromGraph(graph, k)
+		lm.save(filename)
+		return lm
@@ -0,0 +1,177 @@
+''' Incremental path planning (Lifelong Planning A*, LPA*) over a BoxWorld.
+
+LPA* keeps two cost-so-far values for each node between searches:
+  g    the cost found when the node was last expanded
+  rhs  a one-step look-ahead, min(g[pred] + cost(pred, node)) over the preds
+A node is "consistent" when g == rhs. Only inconsistent nodes are queued, so
+when a box changes type only the nodes whose costs change (the affected
+region) are expanded again, and the previous solution is repaired rather than
+replaced. With no changes, a repeated query does no work at all.
+
+The start and target are fixed for a planner state. If either changes the
+state is reset and the next query is a full (A*-like) search.
+
+'''
+from time import perf_counter
+import searches
+from searches import PriorityQueue, CountingQueue, Path
+
+INF = float('inf')
+
+
+class LPAStar(object):
+	''' Incremental planner over a world with x_boxes, y_boxes and a navigation
+	graph (graph). The world graph may be replaced (rebuilt) between queries as
+	long as node idx values stay the same and changed boxes are marked dirty. '''
+
+	def __init__(self, world):
+		self.world = world
+		self.source_idx = None
+		self.target_idx = None
+		self.dirty = set() # box idx values changed since the last query
+		self.generated = 0 # counters for search stats
+		self.reopened = 0
+
+	def reset(self, source_idx, target_idx):
+		''' Forget all costs and start again with a new start and target. '''
+		self.source_idx = source_idx
+		self.target_idx = target_idx
+		self.g = {} # dict of {idx: cost}, missing is infinite
+		self.rhs = {source_idx: 0.0} # dict of {idx: cost}, missing is infinite
+		self.open = PriorityQueue() # inconsistent nodes, keyed by calculate_key
+		self.open.push(source_idx, self.calculate_key(source_idx))
+		self.dirty = set()
+
+	def calculate_key(self, idx):
+		cost = min(self.g.get(idx, INF), self.rhs.get(idx, INF))
+		return (cost + self.world.graph.cost_h(idx, self.target_idx), cost)
+
+	def update_vertex(self, idx):
+		''' Recalculate rhs for a node and (re)queue it if it is inconsistent. '''
+		graph = self.world.graph
+		if idx != self.source_idx:
+			rhs = INF
+			if graph.is_node(idx):
+				for pred in graph.get_predecessors(idx):
+					cost = self.g.get(pred, INF) + graph.get_edge(pred, idx).cost
+					if cost < rhs:
+						rhs = cost
+			if rhs < INF:
+				self.rhs[idx] = rhs
+			else:
+				self.rhs.pop(idx, None)
+		if idx in self.open:
+			self.open.remove(idx)
+		if self.g.get(idx, INF) != self.rhs.get(idx, INF):
+			self.open.push(idx, self.calculate_key(idx))
+
+	def mark_dirty(self, idx):
+		''' Note that box idx has changed, so the edges to and from it have
+		changed. The costs are repaired on the next query. '''
+		self.dirty.add(idx)
+
+	def _neighbours(self, idx):
+		''' The box idx and the (up to) 4 boxes next to it. '''
+		nx, n = self.world.x_boxes, self.world.x_boxes * self.world.y_boxes
+		result = [idx]
+		if idx + nx < n:
+			result.append(idx + nx)
+		if idx - nx >= 0:
+			result.append(idx - nx)
+		if idx % nx + 1 < nx:
+			result.append(idx + 1)
+		if idx % nx > 0:
+			result.append(idx - 1)
+		return result
+
+	def expand_steps(self, counting=False):
+		''' Generator that expands inconsistent nodes, one each step, until the
+		target is consistent and no queued node could give it a lower cost.
+		If counting, the generated and reopened counters are kept. '''
+		target_idx = self.target_idx
+		while len(self.open) and (self.open.top()[1] < self.calculate_key(target_idx)
+				or self.rhs.get(target_idx, INF) != self.g.get(target_idx, INF)):
+			graph = self.world.graph
+			leaf, key = self.open.pop()
+			if self.g.get(leaf, INF) > self.rhs.get(leaf, INF):
+				self.g[leaf] = self.rhs[leaf] # over-consistent, so lower it
+			else:
+				self.g.pop(leaf, None) # under-consistent, so raise it
+				self.update_vertex(leaf)
+				if counting:
+					self.reopened += 1
+			idxs = graph.get_neighbours(leaf)
+			if counting:
+				self.generated += len(idxs)
+			for dest in idxs:
+				self.update_vertex(dest)
+			yield
+
+	def compute_shortest_path(self, limit=0):
+		''' Expand inconsistent nodes (see expand_steps) for up to limit steps
+		(0 for no limit). Returns the number of steps. '''
+		steps = 0
+		for _ in self.expand_steps():
+			steps += 1
+			# stop early?
+			if limit > 0 and steps >= limit:
+				break
+		return steps
+
+	def search_steps(self, source_idx, target_idx):
+		''' Plan (or re-plan) a path from source_idx to target_idx, as a
+		generator (see ResumableSearch). '''
+		if (source_idx, target_idx) != (self.source_idx, self.target_idx):
+			self.reset(source_idx, target_idx)
+		counting = searches.STATS
+		queue = CountingQueue if counting else PriorityQueue
+		if type(self.open) is not queue: # (stats were turned on or off since the last query)
+			self.open = queue.FromQueue(self.open)
+		if counting:
+			start = perf_counter()
+			open = self.open
+			before = (self.generated, open.i, open.pops, open.decreases, self.reopened)
+			open.peak = len(open)
+		for idx in self.dirty:
+			for n in self._neighbours(idx):
+				self.update_vertex(n)
+		self.dirty = set()
+		steps = 0
+
+		def result(copy=False):
+			# follow the lowest cost predecessors back from the target
+			graph = self.world.graph
+			route = {} # dict of {to:from} along the path only
+			curr_idx = target_idx
+			while curr_idx != source_idx and self.g.get(curr_idx, INF) < INF:
+				best, best_cost = None, INF
+				for pred in graph.get_predecessors(curr_idx):
+					cost = self.g.get(pred, INF) + graph.get_edge(pred, curr_idx).cost
+					if cost < best_cost and pred != curr_idx and pred not in route:
+						best, best_cost = pred, cost
+				if best is None:
+					break
+				route[curr_idx] = best
+				curr_idx = best
+			if curr_idx != source_idx: # no (complete) route
+				route = {}
+			route[source_idx] = source_idx
+			stats = None
+			if counting:
+				after = (self.generated, open.i, open.pops, open.decreases, self.reopened)
+				generated, pushes, pops, decreases, reopened = [a - b for a, b in zip(after, before)]
+				stats = searches._stats(start, steps, generated, pushes, pops, decreases,
+					reopened, open.peak)
+			# (a set, not a view of g, so the Path can be pickled and kept)
+			return Path(graph, route, target_idx, list(self.open), set(self.g), steps, stats)
+		yield result
+		for _ in self.expand_steps(counting):
+			steps += 1
+			yield
+
+	def search(self, source_idx, target_idx, limit=0):
+		''' Plan (or re-plan) a path from source_idx to target_idx and return a
+		Path. The route given is only the path itself, the closed nodes are
+		all those with a known cost. The stats (if collected) are for the
+		work done by this query only. '''
+		return searches._run(self.search_steps(source_idx, target_idx), limit)
@@ -0,0 +1,164 @@
+''' Path request service: searches run on a worker thread, not in the caller.
+
+A search run inside a keyboard or mouse handler stops the window from drawing
+until it is done. Instead, a request can be submitted to a PathService, which
+returns a Future straight away and runs the search (the SEARCH_STEPS form, see
+searches.ResumableSearch) on a worker thread.
+
+Requests can be given a channel name. A new request on a channel supersedes
+(cancels) the one before it, so only the latest answer is ever delivered. A
+request is also cancelled if its graph changes before it is done.
+
+The worker searches the live graph (and the world planners for HPA* and LPA*),
+a chunk of steps at a time, holding the service lock. Anything that changes the
+graph from another thread must hold the lock too:
+
+	with service.lock:
+		box.set_type('WALL')
+		world.update_navgraph(box.index)
+
+Callbacks are not called on the worker thread. They are queued, and called by
+poll(), which the main (window) thread should call often, for example:
+
+	pyglet.clock.schedule_interval(service.poll, 1/60.0)
+
+Threads (rather than processes, as in batch.py) are used so the searches can
+share the world graph and planners without copying them for every change.
+
+'''
+import threading
+from concurrent.futures import Future, CancelledError
+from itertools import islice
+from queue import SimpleQueue, Empty
+from time import sleep
+from searches import SEARCH_STEPS
+
+
+class PathRequest(object):
+	''' One search request, and the Future for its Path. '''
+
+	def __init__(self, graph, search, source_idx, target_idx, limit=0, channel=None, callback=None):
+		self.graph = graph
+		self.search = search
+		self.source_idx = source_idx
+		self.target_idx = target_idx
+		self.limit = limit
+		self.channel = channel
+		self.callback = callback # called with the Path (by poll)
+		self.version = graph.version # graph version the request was made for
+		self.future = Future()
+		self.cancelled = threading.Event() # set to stop it, even if running
+
+	def cancel(self):
+		self.cancelled.set()
+		self.future.cancel() # (only works if it has not started)
+
+	def stale(self):
+		return self.cancelled.is_set() or self.graph.version != self.version
+
+
+class PathService(object):
+	''' Runs search requests on worker threads, chunk steps at a time. '''
+
+	def __init__(self, workers=1, chunk=256):
+		self.chunk = chunk # steps searched each time the lock is taken
+		self.lock = threading.RLock() # hold it to change a searched graph
+		self.latest = {} # dict of {channel: PathRequest}
+		self.finished = SimpleQueue() # requests with callbacks still to call
+		self.requests = SimpleQueue() # requests waiting for a worker
+		self.workers = []
+		for i in range(workers):
+			worker = threading.Thread(target=self._work, name='PathService-%d' % i, daemon=True)
+			worker.start()
+			self.workers.append(worker)
+
+	def submit(self, graph, search, source_idx, target_idx, limit=0, channel=None, callback=None):
+		''' Request a SEARCHES[search] Path. Returns a Future. If a channel is
+		given, the last request on the same channel is cancelled. The callback
+		(if any) is called by poll with the Path, unless it was cancelled. '''
+		request = PathRequest(graph, search, source_idx, target_idx, limit, channel, callback)
+		if channel is not None:
+			self.cancel(channel)
+			self.latest[channel] = request
+		self.requests.put(request)
+		return request.future
+
+	def cancel(self, channel):
+		''' Cancel the last request on channel (if it is not done). '''
+		request = self.latest.pop(channel, None)
+		if request:
+			request.cancel()
+
+	def _work(self):
+		while True:
+			request = self.requests.get()
+			if request is None:
+				break
+			if not request.future.set_running_or_notify_cancel():
+				continue # cancelled before it started
+			try:
+				path = self._search(request)
+			except BaseException as e:
+				request.future.set_exception(e)
+				continue
+			if path is None:
+				request.future.set_exception(CancelledError())
+			else:
+				request.future.set_result(path)
+				if request.callback:
+					self.finished.put(request)
+
+	def _search(self, request):
+		''' Run the search of request, a chunk of steps at a time. Returns the
+		Path, or None if the request went stale. '''
+		with self.lock:
+			if request.stale():
+				return None
+			steps = SEARCH_STEPS[request.search](request.graph,
+				request.source_idx, request.target_idx)
+			result = next(steps)
+		taken, limit = 0, request.limit
+		while True:
+			n = self.chunk if limit <= 0 else min(self.chunk, limit - taken)
+			with self.lock:
+				if request.stale():
+					return None
+				count = 0
+				for _ in islice(steps, n):
+					count += 1
+				taken += count
+				if count < n or (limit > 0 and taken >= limit):
+					return result()
+			sleep(0) # let a waiting thread take the lock
+
+	def poll(self, dt=None):
+		''' Call the callbacks of finished (and still current) requests. Call
+		this from the thread that should handle the results. '''
+		while True:
+			try:
+				request = self.finished.get_nowait()
+			except Empty:
+				break
+			if request.stale():
+				continue
+			if request.channel is not None:
+				if self.latest.get(request.channel) is not request:
+					continue
+				del self.latest[request.channel]
+			request.callback(request.future.result())
+
+	def close(self):
+		''' Cancel everything on a channel and stop the workers. '''
+		for channel in list(self.latest):
+			self.cancel(channel)
+		for worker in self.workers:
+			self.requests.put(None)
+		for worker in self.workers:
+			worker.join()
+		self.workers = []
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
@@ -9,63 +9,157 @@ permission.
 See readme.txt for details.
 
 '''
-from heapq import heappush, heappop
+from heapq import heappush, heappop, heapify
+from collections import deque, OrderedDict
+from itertools import islice
+from time import perf_counter
+from weakref import WeakKeyDictionary
+
+_REMOVED = object() # marks a stale PriorityQueue heap entry
+
+STATS = False # set True to collect search counters and timing in Path.stats
 
 class PriorityQueue(object):
-	''' Cost sorted (min-to-max) queue. Equal cost items revert to FIFO order.'''
+	''' Cost sorted (min-to-max) queue. Equal cost items revert to FIFO order.
+	Each item is indexed to its live heap entry, so membership and peek do not
+	scan the queue. Removed or re-costed items leave a stale heap entry that
+	is skipped when popped (lazy deletion).'''
 
 	def __init__(self):
-		self.q = []
-		self.i = 0 # default order counter
+		self.q = [] # heap of [cost, order, item] entries
+		self.entries = {} # item -> live entry in the heap
+		self.i = 0 # default order counter (and count of pushes)
+
+	@classmethod
+	def FromQueue(cls, queue):
+		'''A queue that takes over the items (and order) of another queue,
+		which should not be used after. '''
+		result = cls()
+		result.q, result.entries, result.i = queue.q, queue.entries, queue.i
+		return result
 
 	def push(self, item, cost):
-		'''Add an item and its cost to the queue. '''
-		heappush(self.q, (cost, self.i, item))
+		'''Add an item and its cost to the queue. If the item is already
+		queued it is replaced (and moves behind items of equal cost). '''
+		if item in self.entries:
+			self.remove(item)
+		entry = [cost, self.i, item]
+		self.entries[item] = entry
+		heappush(self.q, entry)
 		self.i += 1
 
+	def decrease_key(self, item, cost):
+		'''Give a queued item a new (lower) cost. As with a remove and push,
+		the item moves behind any queued items of equal cost. '''
+		self.push(item, cost)
+
 	def pop(self):
 		'''Remove the item of lowest cost, or FIFO order if cost equal.
 		Returns the item (whatever it is) and the cost as a tuple. '''
-		cost, i, item = heappop(self.q)
+		while True:
+			cost, i, item = heappop(self.q)
+			if item is not _REMOVED:
+				del self.entries[item]
+				return item, cost
+
+	def top(self):
+		'''Return the lowest cost (item, cost) tuple, without removing. '''
+		while self.q[0][2] is _REMOVED:
+			heappop(self.q)
+		cost, i, item = self.q[0]
 		return item, cost
 
 	def __len__(self):
-		return len(self.q)
+		return len(self.entries)
 
 	def __str__(self):
 		'''Print a sorted view of the queue contents. '''
-		return 'pq: ' + str(sorted(self.q))
+		return 'pq: ' + str(sorted(tuple(entry) for entry in self.entries.values()))
 
 	def __contains__(self, item):
-		return any(item == values[2] for values in self.q)
+		return item in self.entries
 
 	def __iter__(self):
-		'''Support iteration. This enables support of the "in" operator. '''
-		return iter(values[2] for values in self.q)
+		'''Support iteration over the queued items. '''
+		return iter(self.entries)
 
 	def peek(self, item):
 		'''Return a tuple of (item, cost) if it exists, without removing. '''
-		for values in self.q:
-			if values[2] == item:
-				return (item, values[0])
+		entry = self.entries.get(item)
+		if entry is not None:
+			return (item, entry[0])
 
 	def remove(self, item):
-		'''Remove the first item that matches.'''
-		for i, values in enumerate(self.q):
-			if values[2] == item:
-				del self.q[i]
-				return
+		'''Remove the item if it is queued.'''
+		entry = self.entries.pop(item, None)
+		if entry is not None:
+			entry[2] = _REMOVED
+			# drop stale entries once they outnumber the live ones
+			if len(self.q) > 2 * len(self.entries) + 32:
+				self.q = [e for e in self.q if e[2] is not _REMOVED]
+				heapify(self.q)
+
+class CountingQueue(PriorityQueue):
+	''' A PriorityQueue that also counts its pops and decrease_keys and the
+	most items queued at once, for the search stats. The searches only use
+	one when STATS is set, so the counting costs nothing otherwise. '''
+
+	def __init__(self):
+		super(CountingQueue, self).__init__()
+		self.pops = 0
+		self.decreases = 0
+		self.peak = 0 # most items queued at once
+
+	def push(self, item, cost):
+		super(CountingQueue, self).push(item, cost)
+		if len(self.entries) > self.peak:
+			self.peak = len(self.entries)
 
+	def decrease_key(self, item, cost):
+		self.decreases += 1
+		self.push(item, cost)
+
+	def pop(self):
+		self.pops += 1
+		return super(CountingQueue, self).pop()
+
+def _queue(counting):
+	''' A new open list, that counts for the stats if counting. '''
+	return CountingQueue() if counting else PriorityQueue()
+
+def _stats(start, expanded, generated, pushes, pops, decrease_keys, reopened, peak_open):
+	''' The search counters as a dict, for Path.stats. Time is in seconds. '''
+	return {
+		'expanded': expanded, # nodes taken from open (closed)
+		'generated': generated, # successors looked at
+		'pushes': pushes,
+		'pops': pops,
+		'decrease_keys': decrease_keys,
+		'reopened': reopened, # nodes expanded again
+		'peak_open': peak_open, # largest open list size
+		'time': perf_counter() - start,
+	}
+
+def _search_stats(start, steps, generated, open, closed):
+	''' Path.stats for a search with a PriorityQueue open list. '''
+	return _stats(start, steps, generated, open.i, open.pops, open.decreases,
+		steps - len(closed), open.peak)
 
 class Path(object):
-	''' Convenient container and converter for route-path information'''
-	def __init__(self, graph, route, target_idx, open, closed, steps):
+	''' Convenient container and converter for route-path information. A lean
+	Path (see lean) keeps only the path and its cost, and gets the route, open
+	and closed details again only if they are asked for. '''
+	def __init__(self, graph, route, target_idx, open, closed, steps, stats=None):
 		# keep any data if we are asked
-		self.route = route
-		self.open = open
-		self.closed = closed
+		self._route = route
+		self._open = open
+		self._closed = closed
+		self._redo = None # function to search again for lean details
+		self.note = None # why the details are missing (lean), if they are
 		self.target_idx = target_idx
 		self.steps = steps
+		self.stats = stats # dict of search counters, if STATS was set
+		self.bound = None # most times the optimal cost the path can be (ARA*)
 
 		# Convert dictionary back in to a list of nodes for a path
 		if target_idx in route:
@@ -80,16 +174,66 @@ class Path(object):
 			path.append(curr_idx)
 			path.reverse()
 			self.path = path
-			self.path_cost = str(graph.path_cost(path))
+			self.cost = graph.path_cost(path)
 			self.source_idx = curr_idx
 		else:
 			self.result = 'Failed.'
 			self.path = []
-			self.path_cost = '---'
+			self.cost = None
+
+	@property
+	def path_cost(self):
+		''' The path cost as a string ('---' if there is no path). '''
+		return '---' if self.cost is None else str(self.cost)
+
+	def lean(self, redo=None):
+		''' Drop the route, open and closed details (to save memory) and return
+		self. redo is a function that repeats the search (returns a full Path,
+		or None if it can't), called if the details are asked for later.
+		Without it (or if it returns None) the route is just the path, open and
+		closed are empty, and note says why. '''
+		self._route = self._open = self._closed = None
+		self._redo = redo
+		return self
+
+	def _details(self):
+		if self._route is None:
+			full = self._redo() if self._redo else None
+			if full is None:
+				route = {idx: idx for idx in self.path[:1]}
+				for from_idx, to_idx in zip(self.path[:-1], self.path[1:]):
+					route[to_idx] = from_idx
+				self._route, self._open, self._closed = route, [], set()
+				self.note = 'details discarded' + (' (graph changed)' if self._redo else '')
+			else:
+				self._route, self._open, self._closed = full.route, full.open, full.closed
+			self._redo = None
+
+	@property
+	def route(self):
+		self._details()
+		return self._route
+
+	@property
+	def open(self):
+		self._details()
+		return self._open
+
+	@property
+	def closed(self):
+		self._details()
+		return self._closed
 
 	
 	def report(self, verbose=3):
-		tmp = "%s Steps: %d Cost: %s\n" % (self.result, self.steps, self.path_cost)
+		tmp = "%s Steps: %d Cost: %s" % (self.result, self.steps, self.path_cost)
+		tmp += " Bound: %.2f\n" % self.bound if self.bound else "\n"
+		if self.stats:
+			tmp += "Stats: %s\n" % ', '.join('%s=%s' % item for item in self.stats.items())
+		if verbose > 1:
+			self._details()
+			if self.note:
+				tmp += "Note: %s\n" % self.note
 		if verbose > 0:
 			tmp += "Path (%d)=%s\n"  % (len(self.path), self.path)
 		if verbose > 1:
@@ -100,73 +244,183 @@ class Path(object):
 		return tmp
 
 
-def SearchDFS(graph, source_idx, target_idx, limit=0):
-	''' Depth First Search. '''
+def _run(search, limit=0):
+	''' Run a search generator (see ResumableSearch) for up to limit steps (0
+	for no limit) and return the Path. '''
+	result = next(search)
+	for _ in (islice(search, limit) if limit > 0 else search):
+		pass
+	return result()
+
+
+def _costs_from(graph, source_idx, reverse=False, keep=None, target_idx=None):
+	''' Dijkstra from source_idx to every reachable node (only those that
+	keep(idx) is True for, if keep is given), or until target_idx is reached.
+	Returns the cost-so-far and route dictionaries. If reverse, the costs are
+	*to* source_idx (following edges backwards). '''
+	cost_g = {source_idx: 0.0}
+	route = {source_idx: source_idx}
+	closed = set()
+	open = PriorityQueue()
+	open.push(source_idx, 0.0)
+	while len(open):
+		leaf, cost = open.pop()
+		closed.add(leaf)
+		if leaf == target_idx:
+			break
+		idxs = graph.get_predecessors(leaf) if reverse else graph.get_neighbours(leaf)
+		for dest in idxs:
+			if dest in closed or (keep is not None and not keep(dest)):
+				continue
+			edge = graph.get_edge(dest, leaf) if reverse else graph.get_edge(leaf, dest)
+			cost_d = cost + edge.cost
+			if dest in open:
+				if cost_g[dest] <= cost_d:
+					continue
+				open.decrease_key(dest, cost_d)
+			else:
+				open.push(dest, cost_d)
+			cost_g[dest] = cost_d
+			route[dest] = leaf
+	return cost_g, route
+
+def _unreachable(graph, source_idx, target_idx):
+	''' True if the graph knows (see SparseGraph.connected) there is no path. '''
+	connected = getattr(graph, 'connected', None)
+	return connected is not None and not connected(source_idx, target_idx)
+
+def _NoPathSteps(graph, source_idx, target_idx):
+	''' The search generator for a target that can't be reached: nothing to
+	search, so it gives a failed Path without taking a step. '''
+	start = perf_counter() if STATS else 0.0
+	def result(copy=False):
+		stats = _stats(start, 0, 0, 0, 0, 0, 0, 0) if STATS else None
+		return Path(graph, {source_idx: source_idx}, target_idx, [], set(), 0, stats)
+	yield result
+
+
+def SearchDFSSteps(graph, source_idx, target_idx):
+	''' Depth First Search, as a generator (see ResumableSearch). '''
+	if _unreachable(graph, source_idx, target_idx):
+		yield from _NoPathSteps(graph, source_idx, target_idx)
+		return
 	closed = set() # set - of visited nodes
 	route = {} # dict of {to:from} items to find our way home
-	open = [] # use a list as a LIFO stack of the current leaf edges
+	open = deque() # use a deque as a LIFO stack of the current leaf edges
+	frontier = set() # the same nodes as open, for fast "in" tests
 	steps = 0 # if limit
+	counting = STATS # (the stats are counted for the whole search, or not at all)
+	generated = peak = 0 # for stats
+	start = perf_counter() if counting else 0.0
 	# add the starting source as an edge tuple to self
 	open.append( source_idx )
+	frontier.add( source_idx )
 	route[source_idx] = source_idx # to:from
+
+	def result(copy=False):
+		# return the partial/complete path details
+		stats = _stats(start, steps, generated, len(route), steps, 0, 0, max(peak, 1)) if counting else None
+		return Path(graph, dict(route) if copy else route, target_idx, list(open),
+			set(closed) if copy else closed, steps, stats)
+	yield result
 	# search loop
 	while len(open):
 		steps += 1
 		leaf = open.pop() # get the last added (LIFO) edge to investigate
+		frontier.discard(leaf)
 		closed.add(leaf) # set as 'visited'
 		if leaf == target_idx:
 			break
 		else:
 			idxs = graph.get_neighbours(leaf)
 			for dest in idxs:
-				if dest not in closed and dest not in open:
+				if dest not in closed and dest not in frontier:
 					route[dest] = leaf # to:from
 					open.append( dest )
-		# stop early?
-		if limit > 0 and steps >= limit:
-			break
-	# return the partial/complete path details
-	return Path(graph, route, target_idx, open, closed, steps)
+					frontier.add( dest )
+			if counting:
+				generated += len(idxs)
+				if len(open) > peak:
+					peak = len(open)
+		yield # (a limit, or a pause, can stop the search here)
 
-def SearchBFS(graph, source_idx, target_idx, limit=0):
-	''' Breadth First Search. '''
+def SearchDFS(graph, source_idx, target_idx, limit=0):
+	''' Depth First Search. '''
+	return _run(SearchDFSSteps(graph, source_idx, target_idx), limit)
+
+def SearchBFSSteps(graph, source_idx, target_idx):
+	''' Breadth First Search, as a generator (see ResumableSearch). '''
+	if _unreachable(graph, source_idx, target_idx):
+		yield from _NoPathSteps(graph, source_idx, target_idx)
+		return
 	closed = set() # set - of visited nodes
 	route = {} # dict of {to:from} items to find our way home
-	open = [] # use a list as a FIFO queue of the current leaf edges
+	open = deque() # use a deque as a FIFO queue of the current leaf edges
+	frontier = set() # the same nodes as open, for fast "in" tests
 	steps = 0 # if limit
+	counting = STATS
+	generated = peak = 0 # for stats
+	start = perf_counter() if counting else 0.0
 
 	# add the starting source as an edge tuple to self
 	open.append( source_idx )
+	frontier.add( source_idx )
 	route[source_idx] = source_idx # to:from
+
+	def result(copy=False):
+		# return the partial/complete path details
+		stats = _stats(start, steps, generated, len(route), steps, 0, 0, max(peak, 1)) if counting else None
+		return Path(graph, dict(route) if copy else route, target_idx, list(open),
+			set(closed) if copy else closed, steps, stats)
+	yield result
 	# search loop
 	while len(open):
 		steps += 1
-		leaf = open.pop(0) # get's the first (FIFO) node to investigate
+		leaf = open.popleft() # get's the first (FIFO) node to investigate
+		frontier.discard(leaf)
 		closed.add(leaf)
 		if leaf == target_idx:
 			break
 		else:
 			idxs = graph.get_neighbours(leaf)
 			for dest in idxs:
-				if dest not in closed and dest not in open: # visited
+				if dest not in closed and dest not in frontier: # visited
 					route[dest] = leaf # to:from
 					open.append( dest )
-		# stop early?
-		if limit > 0 and steps >= limit:
-			break
-	# return the partial/complete path details
-	return Path(graph, route, target_idx, open, closed, steps)
+					frontier.add( dest )
+			if counting:
+				generated += len(idxs)
+				if len(open) > peak:
+					peak = len(open)
+		yield # (a limit, or a pause, can stop the search here)
 
-def SearchDijkstra(graph, source_idx, target_idx, limit=0):
-	''' Dijkstra Search. Expand the minimum path cost-so-far '''
+def SearchBFS(graph, source_idx, target_idx, limit=0):
+	''' Breadth First Search. '''
+	return _run(SearchBFSSteps(graph, source_idx, target_idx), limit)
+
+def SearchDijkstraSteps(graph, source_idx, target_idx):
+	''' Dijkstra Search, as a generator (see ResumableSearch). '''
+	if _unreachable(graph, source_idx, target_idx):
+		yield from _NoPathSteps(graph, source_idx, target_idx)
+		return
 	closed = set() # set - of visited nodes
 	route = {} # dict of {to:from} items to find our way home
-	open = PriorityQueue() # priority queue of the current leaf edges
+	counting = STATS
+	open = _queue(counting) # priority queue of the current leaf edges
 	steps = 0 # if limit
+	generated = 0 # for stats
+	start = perf_counter() if counting else 0.0
 
 	# add starting node, with cost-so-far (G)
 	open.push( source_idx, 0.0 )
 	route[source_idx] = source_idx # to:from
+
+	def result(copy=False):
+		# return the partial/complete path details
+		stats = _search_stats(start, steps, generated, open, closed) if counting else None
+		return Path(graph, dict(route) if copy else route, target_idx,
+			list(open) if copy else open, set(closed) if copy else closed, steps, stats)
+	yield result
 	# search loop
 	while len(open):
 		steps += 1
@@ -176,31 +430,47 @@ def SearchDijkstra(graph, source_idx, target_idx, limit=0):
 			break
 		else:
 			idxs = graph.get_neighbours(leaf)
+			if counting:
+				generated += len(idxs)
 			for dest in idxs:
 				if dest not in closed: # visited
 					cost_f = cost + graph.get_edge(leaf,dest).cost # cost_g
 					if dest in open: # old path to same node?
 						if open.peek(dest)[1] <= cost_f: # if better, keep it
 							continue
-						else: # remove the old, and the new one be added
-							open.remove(dest)
+						else: # replace the old cost with the new one
+							open.decrease_key(dest, cost_f)
+					else:
+						open.push(dest, cost_f)
 					route[dest] = leaf # to:from
-					open.push(dest, cost_f )
-		# stop early?
-		if limit > 0 and steps >= limit:
-			break
-	# return the partial/complete path details
-	return Path(graph, route, target_idx, open, closed, steps)
+		yield # (a limit, or a pause, can stop the search here)
 
-def SearchAStar(graph, source_idx, target_idx, limit=0):
-	''' A* Search. Expand the minimum path cost-so-far + lowest heuristic cost. '''
+def SearchDijkstra(graph, source_idx, target_idx, limit=0):
+	''' Dijkstra Search. Expand the minimum path cost-so-far '''
+	return _run(SearchDijkstraSteps(graph, source_idx, target_idx), limit)
+
+def SearchAStarSteps(graph, source_idx, target_idx):
+	''' A* Search, as a generator (see ResumableSearch). '''
+	if _unreachable(graph, source_idx, target_idx):
+		yield from _NoPathSteps(graph, source_idx, target_idx)
+		return
 	closed = set() # set - of visited nodes
 	route = {} # dict of {to:from} items to find our way home
-	open = PriorityQueue() # priority queue of the current leaf edges
+	counting = STATS
+	open = _queue(counting) # priority queue of the current leaf edges
 	steps = 0
+	generated = 0 # for stats
+	start = perf_counter() if counting else 0.0
 	# add starting node, with F = cost-so-far (G) + heuristic (H)
 	open.push(source_idx, graph.cost_h(source_idx, target_idx) )
 	route[source_idx] = source_idx
+
+	def result(copy=False):
+		# return the partial/complete path details
+		stats = _search_stats(start, steps, generated, open, closed) if counting else None
+		return Path(graph, dict(route) if copy else route, target_idx,
+			list(open) if copy else open, set(closed) if copy else closed, steps, stats)
+	yield result
 	# search loop
 	while len(open):
 		steps += 1
@@ -213,6 +483,8 @@ def SearchAStar(graph, source_idx, target_idx, limit=0):
 			cost = cost_f - graph.cost_h(leaf, target_idx)
 			# get new children
 			idxs = graph.get_neighbours(leaf)
+			if counting:
+				generated += len(idxs)
 			for dest in idxs:
 				if dest not in closed: # visited
 					cost_g = cost + graph.get_edge(leaf, dest).cost # G cost-so-far
@@ -222,15 +494,622 @@ def SearchAStar(graph, source_idx, target_idx, limit=0):
 						if open.peek(dest)[1] <= cost_f:
 							continue
 						else:
-							open.remove(dest)
+							open.decrease_key(dest, cost_f)
+					else:
+						open.push(dest, cost_f)
 					route[dest] = leaf
-					open.push(dest, cost_f)
-		# stop early?
+		yield # (a limit, or a pause, can stop the search here)
+
+def SearchAStar(graph, source_idx, target_idx, limit=0):
+	''' A* Search. Expand the minimum path cost-so-far + lowest heuristic cost. '''
+	return _run(SearchAStarSteps(graph, source_idx, target_idx), limit)
+
+
+def _join_route(route_f, route_b, meet_idx, source_idx, target_idx):
+	''' Return the node list source..meet..target made from a forward {to:from}
+	route and a backward {from:to} route. Any (zero-cost) loop is cut out. '''
+	head = [meet_idx]
+	while head[-1] != source_idx:
+		head.append(route_f[head[-1]])
+	head.reverse()
+	tail = []
+	curr_idx = meet_idx
+	while curr_idx != target_idx:
+		curr_idx = route_b[curr_idx]
+		tail.append(curr_idx)
+	path, pos = [], {}
+	for idx in head + tail:
+		if idx in pos:
+			for dropped in path[pos[idx]+1:]:
+				del pos[dropped]
+			del path[pos[idx]+1:]
+		else:
+			pos[idx] = len(path)
+			path.append(idx)
+	return path
+
+def _SearchBidirectionalSteps(graph, source_idx, target_idx, cost_p):
+	''' Search forward from the source and backward from the target at the same
+	time, expanding the side with the smaller open list. cost_p(idx) is a node
+	potential added to forward keys and subtracted from backward keys (zero for
+	Dijkstra). The best meeting cost found is kept, and the search stops once
+	the two lowest open keys add up to it (no cheaper route can still meet).
+	'''
+	if _unreachable(graph, source_idx, target_idx):
+		yield from _NoPathSteps(graph, source_idx, target_idx)
+		return
+	# index 0 is the forward search, index 1 the backward search
+	closed = (set(), set()) # sets - of visited nodes
+	route = ({source_idx: source_idx}, {target_idx: target_idx}) # to:from, from:to
+	cost_g = ({source_idx: 0.0}, {target_idx: 0.0}) # cost-so-far for each side
+	counting = STATS
+	open = (_queue(counting), _queue(counting)) # priority queues of leaf edges
+	sign = (1, -1)
+	steps = 0
+	best, meet = (0.0, source_idx) if source_idx == target_idx else (float('inf'), None)
+	done = False
+	generated = peak = 0 # for stats
+	start = perf_counter() if counting else 0.0
+
+	open[0].push(source_idx, cost_p(source_idx))
+	open[1].push(target_idx, -cost_p(target_idx))
+
+	def result(copy=False):
+		# one {to:from} route: the forward tree, the backward tree, then the path
+		path_route = dict(route[1])
+		del path_route[target_idx]
+		path_route.update(route[0])
+		if meet is not None:
+			path = _join_route(route[0], route[1], meet, source_idx, target_idx)
+			for from_idx, to_idx in zip(path[:-1], path[1:]):
+				path_route[to_idx] = from_idx
+			path_route[source_idx] = source_idx
+		open_idxs = [idx for q in open for idx in q if idx != target_idx]
+		if meet is not None and not done:
+			open_idxs.append(target_idx) # a route, but not yet known to be the best
+		# return the partial/complete path details
+		stats = None
+		if counting:
+			stats = _stats(start, steps, generated, open[0].i + open[1].i,
+				open[0].pops + open[1].pops, open[0].decreases + open[1].decreases,
+				steps - len(closed[0]) - len(closed[1]), max(peak, 2))
+		return Path(graph, path_route, target_idx, open_idxs, closed[0] | closed[1], steps, stats)
+	yield result
+	# search loop
+	while len(open[0]) and len(open[1]):
+		if open[0].top()[1] + open[1].top()[1] >= best: # meet-in-the-middle
+			done = True
+			break
+		steps += 1
+		side = 0 if len(open[0]) <= len(open[1]) else 1
+		other = 1 - side
+		leaf, key = open[side].pop()
+		closed[side].add(leaf)
+		cost = cost_g[side][leaf]
+		if side == 0:
+			idxs = graph.get_neighbours(leaf)
+		else:
+			idxs = graph.get_predecessors(leaf)
+		for dest in idxs:
+			if dest in closed[side]: # visited
+				continue
+			if side == 0:
+				cost_d = cost + graph.get_edge(leaf, dest).cost
+			else:
+				cost_d = cost + graph.get_edge(dest, leaf).cost
+			key = cost_d + sign[side] * cost_p(dest)
+			if dest in open[side]:
+				if cost_g[side][dest] <= cost_d:
+					continue
+				open[side].decrease_key(dest, key)
+			else:
+				open[side].push(dest, key)
+			cost_g[side][dest] = cost_d
+			route[side][dest] = leaf
+			# does this reach a node the other side has already found?
+			if dest in cost_g[other] and cost_d + cost_g[other][dest] < best:
+				best, meet = cost_d + cost_g[other][dest], dest
+		if counting:
+			generated += len(idxs)
+			if len(open[0]) + len(open[1]) > peak:
+				peak = len(open[0]) + len(open[1])
+		yield # (a limit, or a pause, can stop the search here)
+	else:
+		done = True # one side ran out of nodes, so best can't be improved
+
+def SearchBiDijkstraSteps(graph, source_idx, target_idx):
+	''' Bidirectional Dijkstra Search, as a generator (see ResumableSearch). '''
+	return _SearchBidirectionalSteps(graph, source_idx, target_idx, lambda idx: 0.0)
+
+def SearchBiDijkstra(graph, source_idx, target_idx, limit=0):
+	''' Bidirectional Dijkstra Search. Expand the minimum path cost-so-far from
+	both the source and the target until the two searches meet. '''
+	return _run(SearchBiDijkstraSteps(graph, source_idx, target_idx), limit)
+
+def SearchBiAStarSteps(graph, source_idx, target_idx):
+	''' Bidirectional A* Search, as a generator (see ResumableSearch). '''
+	cost_h = graph.cost_h
+	def cost_p(idx):
+		return (cost_h(idx, target_idx) - cost_h(source_idx, idx)) / 2
+	return _SearchBidirectionalSteps(graph, source_idx, target_idx, cost_p)
+
+def SearchBiAStar(graph, source_idx, target_idx, limit=0):
+	''' Bidirectional A* Search. As for bidirectional Dijkstra, using the
+	average of the forward and backward heuristic as each node potential.
+	The path is only the cheapest if cost_h never over-estimates (and is
+	consistent); with an over-estimate it can also expand more nodes than
+	plain Dijkstra. '''
+	return _run(SearchBiAStarSteps(graph, source_idx, target_idx), limit)
+
+
+def SearchJPS(graph, source_idx, target_idx, limit=0):
+	''' Jump Point Search. A* over a 4-connected tile grid that only expands
+	"jump points". Within a region of one tile type every step costs the same,
+	so of the equal cost routes only one canonical route is kept: horizontal
+	runs that may turn vertical anywhere, vertical runs that only turn when an
+	obstacle forces it. Straight runs "jump" past tiles that are not worth
+	expanding. Tiles next to a different (passable) tile type are boundary
+	tiles, which stop jumps and are expanded normally (all 4 sides).
+
+	The boundary tiles and jumps don't depend on the source or target, so
+	they are kept with the graph (until it changes) and reused by later
+	queries. JPS expands far fewer nodes than A*, but each jump is a Python
+	loop over the tiles it passes, so it is only faster (in time) on maps
+	with big areas of one box type, once the tables are filled. On mixed
+	mud/water maps almost every tile is a boundary tile and A* is faster.
+
+	Needs graph.grid (a world with x_boxes, y_boxes and tile_type(idx)),
+	otherwise this is the same as SearchAStar.
+	'''
+	return _run(SearchJPSSteps(graph, source_idx, target_idx), limit)
+
+def SearchJPSSteps(graph, source_idx, target_idx):
+	''' Jump Point Search, as a generator (see ResumableSearch). '''
+	grid = getattr(graph, 'grid', None)
+	if grid is None:
+		return SearchAStarSteps(graph, source_idx, target_idx)
+	return _SearchJPSSteps(graph, grid, source_idx, target_idx)
+
+_JPS_TABLES = WeakKeyDictionary() # {graph: (version, boundary, jumps)}
+
+def _jps_tables(graph):
+	''' The boundary and jump tables of graph. They don't depend on the source
+	or target, so are kept (and filled in by each query) until the graph
+	version changes. '''
+	tables = _JPS_TABLES.get(graph)
+	if tables is None or tables[0] != graph.version:
+		tables = (graph.version, {}, {})
+		_JPS_TABLES[graph] = tables
+	return tables[1], tables[2]
+
+def _SearchJPSSteps(graph, grid, source_idx, target_idx):
+	if _unreachable(graph, source_idx, target_idx):
+		yield from _NoPathSteps(graph, source_idx, target_idx)
+		return
+	nx, ny = grid.x_boxes, grid.y_boxes
+	size = nx * ny
+	tile_type = grid.tile_type
+	is_edge = graph.is_edge
+	# cache of idx -> True if a boundary tile, and of (idx, step delta) ->
+	# (jump point or -1, last tile of the run), ignoring the target
+	boundary, jumps = _jps_tables(graph)
+	tx, ty = target_idx % nx, target_idx // nx
+
+	def step(idx, dx, dy):
+		''' index of the next tile in the (dx,dy) direction, or -1 '''
+		x, y = idx % nx + dx, idx // nx + dy
+		return x + y * nx if 0 <= x < nx and 0 <= y < ny else -1
+
+	def is_boundary(idx):
+		result = boundary.get(idx)
+		if result is None:
+			kind = tile_type(idx)
+			x = idx % nx
+			result = False
+			for n in (idx+1 if x+1 < nx else -1, idx-1 if x > 0 else -1, idx+nx, idx-nx):
+				if 0 <= n < size and tile_type(n) != kind and (is_edge(idx, n) or is_edge(n, idx)):
+					result = True
+					break
+			boundary[idx] = result
+		return result
+
+	def forced(prev, idx):
+		''' True if a vertical move prev->idx (idx not a boundary tile) has a
+		forced horizontal turn: a side tile that is cheapest to reach via idx '''
+		kind = tile_type(idx)
+		for sx in (1, -1):
+			x = idx % nx + sx
+			if 0 <= x < nx and is_edge(idx, idx + sx):
+				behind = prev + sx
+				if not (is_edge(prev, behind) and is_edge(behind, idx + sx)
+						and tile_type(behind) == kind):
+					return True
+		return False
+
+	def run(idx, dx, dy):
+		''' Return (the next jump point or -1, the last tile reached) from idx
+		in the (dx,dy) direction, if there was no target '''
+		passed = [] # every tile passed on the way jumps to the same place
+		delta = dx + dy * nx
+		while True:
+			if (idx, delta) in jumps:
+				result = jumps[idx, delta]
+				break
+			passed.append(idx)
+			n = idx + delta
+			if dx and not 0 <= idx % nx + dx < nx or not is_edge(idx, n):
+				result = (-1, idx)
+				break
+			if is_boundary(n):
+				result = (n, n)
+				break
+			if dy: # vertical, stop at a forced turn
+				if forced(idx, n):
+					result = (n, n)
+					break
+			elif run(n, 0, 1)[0] >= 0 or run(n, 0, -1)[0] >= 0:
+				result = (n, n) # horizontal, stop where a vertical run finds something
+				break
+			idx = n
+		for idx in passed:
+			jumps[idx, delta] = result
+		return result
+
+	def between(a, b, c, d):
+		''' True if b is after a, and not after c, in the d direction '''
+		return d * (b - a) > 0 and d * (c - b) >= 0
+
+	def jump(idx, dx, dy):
+		''' Return the next jump point from idx in the (dx,dy) direction, or -1.
+		As run, but a run also stops at the target, and a horizontal run at
+		the tile in the target column if a vertical run from there reaches it '''
+		point, end = run(idx, dx, dy)
+		x, y = idx % nx, idx // nx
+		if dy:
+			if x == tx and between(y, ty, end // nx, dy):
+				return target_idx
+		elif between(x, tx, end % nx, dx):
+			turn = y * nx + tx
+			if turn == target_idx:
+				return turn
+			dy = 1 if ty > y else -1
+			if between(y, ty, run(turn, 0, dy)[1] // nx, dy):
+				return turn
+		return point
+
+	def line_cost(from_idx, to_idx, dx, dy):
+		''' the cost of the straight run of edges from_idx..to_idx '''
+		cost = 0.0
+		while from_idx != to_idx:
+			n = step(from_idx, dx, dy)
+			cost += graph.get_edge(from_idx, n).cost
+			from_idx = n
+		return cost
+
+	closed = set() # set - of visited (expanded) jump points
+	route = {} # dict of {to:from} jump points to find our way home
+	arrival = {} # dict of {idx: (dx,dy)} direction each jump point was reached
+	cost_g = {source_idx: 0.0} # cost-so-far of each jump point
+	counting = STATS
+	open = _queue(counting) # priority queue of the current jump points
+	steps = 0
+	generated = 0 # for stats (jump points found)
+	start = perf_counter() if counting else 0.0
+	open.push(source_idx, graph.cost_h(source_idx, target_idx))
+	route[source_idx] = source_idx
+	arrival[source_idx] = None
+
+	def result(copy=False):
+		# fill in the tiles jumped over on the way back from the target
+		path_route = dict(route) if copy else route
+		if target_idx in route:
+			curr_idx = target_idx
+			while curr_idx != route[curr_idx]:
+				from_idx = route[curr_idx]
+				dx, dy = arrival[curr_idx]
+				while curr_idx != from_idx:
+					prev_idx = step(curr_idx, -dx, -dy)
+					path_route[curr_idx] = prev_idx
+					curr_idx = prev_idx
+		# return the partial/complete path details
+		stats = _search_stats(start, steps, generated, open, closed) if counting else None
+		return Path(graph, path_route, target_idx, list(open), set(closed) if copy else closed, steps, stats)
+	yield result
+	# search loop
+	while len(open):
+		steps += 1
+		leaf, cost_f = open.pop() # get the lowest cost node to investigate
+		closed.add(leaf) # set 'visited'
+		if leaf == target_idx:
+			break
+		# pruned directions to jump in
+		d = arrival[leaf]
+		if d is None or is_boundary(leaf):
+			dirs = ((1,0), (-1,0), (0,1), (0,-1))
+		elif d[1] == 0: # arrived horizontally
+			dirs = (d, (0,1), (0,-1))
+		elif forced(step(leaf, -d[0], -d[1]), leaf):
+			dirs = (d, (1,0), (-1,0))
+		else:
+			dirs = (d,)
+		for dx, dy in dirs:
+			dest = jump(leaf, dx, dy)
+			if dest < 0:
+				continue
+			if counting:
+				generated += 1
+			if dest in closed:
+				continue
+			cost = cost_g[leaf] + line_cost(leaf, dest, dx, dy)
+			cost_f = cost + graph.cost_h(dest, target_idx)
+			if dest in open:
+				if cost_g[dest] <= cost:
+					continue
+				open.decrease_key(dest, cost_f)
+			else:
+				open.push(dest, cost_f)
+			cost_g[dest] = cost
+			route[dest] = leaf
+			arrival[dest] = (dx, dy)
+		yield # (a limit, or a pause, can stop the search here)
+
+
+def SearchARAStar(graph, source_idx, target_idx, limit=0, budget=10.0, epsilon=3.0, delta=0.5):
+	''' Anytime Repairing A* (ARA*) Search. A* with the heuristic inflated
+	(multiplied) by epsilon finds a path quickly, then epsilon is lowered by
+	delta and the search is repaired (not restarted) to find a better path,
+	for as long as the time budget (in milliseconds) lasts. The best path found
+	is returned, with its bound: the most times the optimal path cost it can
+	be (if cost_h never over-estimates), 1.0 when it is known to be optimal.
+	The first path is always finished, however long it takes, so the budget
+	can only cut the improving short. If the step limit runs out before any
+	path is found the result is partial, as for the other searches.
+	'''
+	deadline = perf_counter() + budget / 1000.0
+	search = SearchARAStarSteps(graph, source_idx, target_idx, epsilon, delta)
+	result = next(search)
+	for steps, bound in enumerate(search, 1):
 		if limit > 0 and steps >= limit:
 			break
-	# return the partial/complete path details
-	return Path(graph, route, target_idx, open, closed, steps)
+		if bound is not None and steps % 64 == 0 and perf_counter() > deadline:
+			break
+	return result()
+
+def SearchARAStarSteps(graph, source_idx, target_idx, epsilon=3.0, delta=0.5):
+	''' ARA* Search, as a generator (see ResumableSearch). There is no time
+	budget, the path keeps improving (as it is stepped) until it is optimal.
+	Each step yields the bound of the best path so far (None before the first). '''
+	if _unreachable(graph, source_idx, target_idx):
+		yield from _NoPathSteps(graph, source_idx, target_idx)
+		return
+	counting = STATS
+	start = perf_counter() if counting else 0.0
+	cost_h = graph.cost_h
+	inf = float('inf')
+	cost_g = {source_idx: 0.0} # cost-so-far
+	route = {source_idx: source_idx} # dict of {to:from} items to find our way home
+	closed = set() # set - of nodes expanded with the current epsilon
+	expanded = set() # set - of nodes expanded with any epsilon
+	incons = set() # closed nodes given a lower cost, to open for the next epsilon
+	open = _queue(counting) # priority queue of the current leaf edges
+	steps = generated = 0
+	best, bound = None, None # best path so far, and its bound
+	open.push(source_idx, epsilon * cost_h(source_idx, target_idx))
+
+	def result(copy=False):
+		path_route = dict(route)
+		open_idxs = list(open) + list(incons)
+		if best:
+			for from_idx, to_idx in zip(best[:-1], best[1:]):
+				path_route[to_idx] = from_idx
+			if bound == 1.0 and target_idx in open_idxs:
+				open_idxs.remove(target_idx) # done, nothing could be better
+		# return the partial/complete path details
+		stats = None
+		if counting:
+			stats = _stats(start, steps, generated, open.i, open.pops, open.decreases,
+				steps - len(expanded), open.peak)
+		path = Path(graph, path_route, target_idx, open_idxs,
+			set(expanded) if copy else expanded, steps, stats)
+		path.bound = bound
+		return path
+	yield result
+	while True:
+		# expand until no open node can give the target a lower (inflated) cost
+		while len(open) and open.top()[1] < cost_g.get(target_idx, inf):
+			steps += 1
+			leaf, key = open.pop()
+			closed.add(leaf)
+			expanded.add(leaf)
+			cost = cost_g[leaf]
+			idxs = graph.get_neighbours(leaf)
+			if counting:
+				generated += len(idxs)
+			for dest in idxs:
+				cost_d = cost + graph.get_edge(leaf, dest).cost
+				if cost_d < cost_g.get(dest, inf):
+					cost_g[dest] = cost_d
+					route[dest] = leaf
+					if dest in closed:
+						incons.add(dest)
+					else:
+						open.push(dest, cost_d + epsilon * cost_h(dest, target_idx))
+			yield bound # (a limit, time budget or pause can stop the search here)
+		if target_idx not in cost_g:
+			break
+		# a (better) path, and how far from optimal it could be
+		path = [target_idx]
+		while path[-1] != source_idx:
+			path.append(route[path[-1]])
+		path.reverse()
+		best = path
+		lowest = min([cost_g[idx] + cost_h(idx, target_idx) for idx in open]
+			+ [cost_g[idx] + cost_h(idx, target_idx) for idx in incons])
+		if epsilon <= 1.0 or lowest >= cost_g[target_idx]:
+			bound = 1.0
+			break
+		bound = max(1.0, min(epsilon, cost_g[target_idx] / lowest)) if lowest > 0 else epsilon
+		# lower epsilon and re-key the open (and inconsistent) nodes
+		epsilon = max(1.0, epsilon - delta)
+		for idx in list(open) + list(incons):
+			open.push(idx, cost_g[idx] + epsilon * cost_h(idx, target_idx))
+		incons = set()
+		closed = set()
+
+
+def SearchIDAStar(graph, source_idx, target_idx, limit=0, table=65536):
+	''' Iterative Deepening A* (IDA*) Search. A depth first search that only
+	goes as deep as a cost bound (cost-so-far + heuristic cost), started again
+	with the next higher bound until the target is found. Only the current path
+	(and the untried neighbours along it) is kept, so memory use is tiny and
+	fixed, at the cost of expanding nodes many times.
+
+	The transposition table remembers the lowest cost-so-far each node has been
+	reached with (in this pass), so a node reached again at a higher cost is not
+	searched again. It keeps at most table nodes (the first reached in each
+	pass), or is not used at all if table is 0. With a table much smaller than
+	the graph, a long path (or no path) can take a very long time to search.
+	The route, open and closed details are those of the current (last) depth
+	first path.
+	'''
+	return _run(SearchIDAStarSteps(graph, source_idx, target_idx, table), limit)
+
+def SearchIDAStarSteps(graph, source_idx, target_idx, table=65536):
+	''' IDA* Search, as a generator (see ResumableSearch). '''
+	if _unreachable(graph, source_idx, target_idx):
+		yield from _NoPathSteps(graph, source_idx, target_idx)
+		return
+	counting = STATS
+	start = perf_counter() if counting else 0.0
+	cost_h = graph.cost_h
+	inf = float('inf')
+	seen = {} # transposition table of {idx: lowest cost-so-far}
+	path = [source_idx] # the current depth first path
+	costs = [0.0] # cost-so-far of each node of path
+	pending = [None] # list of untried (idx, cost) for each node of path
+	on_path = set(path)
+	bound = cost_h(source_idx, target_idx) # highest cost_f to search this pass
+	steps = generated = pushes = pops = reopened = 0
+	frontier = peak = 0 # untried nodes (for stats)
+	found = False
+
+	def result(copy=False):
+		route = {to_idx: from_idx for from_idx, to_idx in zip(path[:-1], path[1:])}
+		route[source_idx] = source_idx
+		open_idxs = [idx for kids in pending if kids for idx, cost in kids]
+		if found: # done, other untried ways to the target don't matter
+			open_idxs = [idx for idx in open_idxs if idx != target_idx]
+		stats = None
+		if counting:
+			stats = _stats(start, steps, generated, pushes, pops, 0, reopened, peak)
+		return Path(graph, route, target_idx, open_idxs, set(path), steps, stats)
+	yield result
+	while True:
+		next_bound = inf # lowest cost_f that was over the bound
+		while path:
+			leaf = path[-1]
+			if pending[-1] is None: # not yet expanded
+				steps += 1
+				if leaf == target_idx:
+					found = True
+					return
+				cost = costs[-1]
+				kids = []
+				idxs = graph.get_neighbours(leaf)
+				for dest in idxs:
+					if dest in on_path:
+						continue
+					cost_g = cost + graph.get_edge(leaf, dest).cost
+					cost_f = cost_g + cost_h(dest, target_idx)
+					if cost_f > bound:
+						if cost_f < next_bound:
+							next_bound = cost_f
+					elif seen.get(dest, inf) > cost_g:
+						kids.append((dest, cost_g))
+				kids.reverse() # so they are popped in neighbour order
+				pending[-1] = kids
+				if counting:
+					generated += len(idxs)
+					pushes += len(kids)
+					frontier += len(kids)
+					if frontier > peak:
+						peak = frontier
+				yield # (a limit, or a pause, can stop the search here)
+			elif pending[-1]:
+				dest, cost_g = pending[-1].pop()
+				if counting:
+					pops += 1
+					frontier -= 1
+				if table:
+					if seen.get(dest, inf) <= cost_g:
+						continue # already searched from here, as cheaply
+					if dest in seen:
+						if counting:
+							reopened += 1
+						seen[dest] = cost_g
+					elif len(seen) < table:
+						seen[dest] = cost_g
+				path.append(dest)
+				costs.append(cost_g)
+				pending.append(None)
+				on_path.add(dest)
+			else: # all tried, back up
+				on_path.discard(path.pop())
+				costs.pop()
+				pending.pop()
+		if next_bound == inf:
+			break # no path
+		# again, from the start, with the next bound
+		bound = next_bound
+		seen.clear()
+		path.append(source_idx)
+		costs.append(0.0)
+		pending.append(None)
+		on_path.add(source_idx)
+
+
+def SearchHPA(graph, source_idx, target_idx, limit=0):
+	''' Hierarchical A* Search. A* over an abstract graph of cluster entrances,
+	refined back to a full path. Needs graph.grid (a world that keeps a
+	HierarchicalPlanner, see hpa.py), otherwise this is the same as SearchAStar.
+	'''
+	grid = getattr(graph, 'grid', None)
+	if grid is None:
+		return SearchAStar(graph, source_idx, target_idx, limit)
+	if _unreachable(graph, source_idx, target_idx):
+		return _run(_NoPathSteps(graph, source_idx, target_idx))
+	return grid.hierarchy().search(source_idx, target_idx, limit)
+
+def SearchHPASteps(graph, source_idx, target_idx):
+	''' Hierarchical A* Search, as a generator (see ResumableSearch). '''
+	grid = getattr(graph, 'grid', None)
+	if grid is None:
+		return SearchAStarSteps(graph, source_idx, target_idx)
+	if _unreachable(graph, source_idx, target_idx):
+		return _NoPathSteps(graph, source_idx, target_idx)
+	return grid.hierarchy().search_steps(source_idx, target_idx)
+
+
+def SearchLPAStar(graph, source_idx, target_idx, limit=0):
+	''' Lifelong Planning A* Search. Keeps its costs between searches and only
+	repairs them where boxes have changed. Needs graph.grid (a world that keeps
+	an LPAStar planner, see lpa.py), otherwise this is the same as SearchAStar.
+	'''
+	grid = getattr(graph, 'grid', None)
+	if grid is None:
+		return SearchAStar(graph, source_idx, target_idx, limit)
+	if _unreachable(graph, source_idx, target_idx):
+		return _run(_NoPathSteps(graph, source_idx, target_idx))
+	return grid.incremental().search(source_idx, target_idx, limit)
 
+def SearchLPAStarSteps(graph, source_idx, target_idx):
+	''' Lifelong Planning A* Search, as a generator (see ResumableSearch). '''
+	grid = getattr(graph, 'grid', None)
+	if grid is None:
+		return SearchAStarSteps(graph, source_idx, target_idx)
+	if _unreachable(graph, source_idx, target_idx):
+		return _NoPathSteps(graph, source_idx, target_idx)
+	return grid.incremental().search_steps(source_idx, target_idx)
 
 
 # A simple dictionary with string keys to each search class type.
@@ -239,8 +1118,139 @@ SEARCHES = {
 	2: SearchBFS,
 	3: SearchDijkstra,
 	4: SearchAStar,
+	5: SearchBiDijkstra,
+	6: SearchBiAStar,
+	7: SearchJPS,
+	8: SearchHPA,
+	9: SearchLPAStar,
+	10: SearchARAStar,
+	11: SearchIDAStar,
 }
 
+# The same searches, as generators (see ResumableSearch).
+SEARCH_STEPS = {
+	1: SearchDFSSteps,
+	2: SearchBFSSteps,
+	3: SearchDijkstraSteps,
+	4: SearchAStarSteps,
+	5: SearchBiDijkstraSteps,
+	6: SearchBiAStarSteps,
+	7: SearchJPSSteps,
+	8: SearchHPASteps,
+	9: SearchLPAStarSteps,
+	10: SearchARAStarSteps,
+	11: SearchIDAStarSteps,
+}
+
+
+class ResumableSearch(object):
+	''' A search (SEARCH_STEPS[search]) that can be run a few steps at a time,
+	keeping its open and closed state between calls. The graph should not be
+	changed while the search is unfinished.
+
+	Example (in a game loop, at most 200 steps each frame):
+		task = ResumableSearch(world.graph, 4, start, target)
+		...
+		if not task.done:
+			task.step(200)
+			path = task.result() # the path so far (partial until done)
+	'''
+
+	def __init__(self, graph, search, source_idx, target_idx, **options):
+		self.search = search
+		self._steps = SEARCH_STEPS[search](graph, source_idx, target_idx, **options)
+		self._result = next(self._steps)
+		self._path = None # the final Path, once done
+		self.steps = 0 # number of steps taken so far
+		self.done = False
+
+	def step(self, n=1):
+		''' Take up to n more steps. Returns True if the search is done. '''
+		if not self.done:
+			taken = 0
+			for _ in islice(self._steps, n):
+				taken += 1
+			self.steps += taken
+			self.done = taken < n
+		return self.done
+
+	def result(self):
+		''' The Path so far. Until the search is done it is a snapshot, it will
+		not change as the search goes on. '''
+		if self._path is None:
+			if not self.done:
+				return self._result(copy=True)
+			self._path = self._result()
+		return self._path
+
+
+def _redo(graph, search, source_idx, target_idx, limit=0):
+	''' Return a function that repeats a search, for a lean Path. It returns
+	None if the graph has changed since (the search can't be repeated). '''
+	version = graph.version
+	def redo():
+		if graph.version != version:
+			return None
+		return SEARCHES[search](graph, source_idx, target_idx, limit)
+	return redo
+
+def run_search(graph, search, source_idx, target_idx, limit=0, lean=False):
+	''' Return the Path of SEARCHES[search]. If lean, the Path keeps only the
+	path and its cost. Its other details (for rendering or a full report) are
+	found by searching again if they are needed, which is only possible while
+	the graph is unchanged (after that, see Path.lean). '''
+	path = SEARCHES[search](graph, source_idx, target_idx, limit)
+	if lean:
+		path.lean(_redo(graph, search, source_idx, target_idx, limit))
+	return path
+
+
+class PathCache(object):
+	''' A least recently used (LRU) cache of search results for one graph.
+	Results are keyed on the graph version (so any change to the graph means a
+	new search), the heuristic, the search number, source, target and limit
+	(and whether stats are collected).
+	'''
+
+	def __init__(self, size=64):
+		self.size = size
+		self.graph = None
+		self.version = None
+		self.paths = OrderedDict() # dict of {key: Path}, oldest used first
+		self.hits = 0
+		self.misses = 0
+
+	def _key(self, graph, search, source_idx, target_idx, limit):
+		if graph is not self.graph or graph.version != self.version:
+			# the old results can never be asked for again
+			self.paths.clear()
+			self.graph, self.version = graph, graph.version
+		return (graph.cost_h, search, source_idx, target_idx, limit, STATS)
+
+	def get(self, graph, search, source_idx, target_idx, limit=0):
+		''' Return the cached Path, or None if there isn't one. '''
+		key = self._key(graph, search, source_idx, target_idx, limit)
+		if key in self.paths:
+			self.hits += 1
+			self.paths.move_to_end(key)
+			return self.paths[key]
+		self.misses += 1
+		return None
+
+	def add(self, graph, search, source_idx, target_idx, limit, path):
+		''' Cache a Path found (say, by a PathService) for the current graph. '''
+		self.paths[self._key(graph, search, source_idx, target_idx, limit)] = path
+		if len(self.paths) > self.size:
+			self.paths.popitem(last=False)
+
+	def search(self, graph, search, source_idx, target_idx, limit=0):
+		''' Return the Path of SEARCHES[search], searching only if needed. '''
+		path = self.get(graph, search, source_idx, target_idx, limit)
+		if path is None:
+			path = SEARCHES[search](graph, source_idx, target_idx, limit)
+			self.add(graph, search, source_idx, target_idx, limit, path)
+		return path
+
 
 #==============================================================================
 
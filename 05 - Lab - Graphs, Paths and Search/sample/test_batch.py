@@ -0,0 +1,35 @@
+''' Tests of the batched path planning (batch.py). Run with pytest. '''
+import random
+import pytest
+from box_map import BoxMap
+from searches import SEARCHES
+from batch import BatchPlanner, plan_paths
+
+
+@pytest.fixture(scope='module')
+def world():
+	return BoxMap.Random(16, 16, seed=9)
+
+def queries(world, count=6):
+	rand = random.Random(9)
+	idxs = [i for i in range(len(world.types)) if world.tile_type(i) != 'WALL']
+	return [tuple(rand.sample(idxs, 2)) for _ in range(count)]
+
+@pytest.mark.parametrize('lean', (False, True))
+def test_every_search_in_a_batch(world, lean):
+	jobs = queries(world)
+	with BatchPlanner(world.graph, processes=2) as planner:
+		for key, search in SEARCHES.items():
+			paths = planner.plan(jobs, search=key, lean=lean)
+			for path, (s, t) in zip(paths, jobs):
+				here = search(world.graph, s, t)
+				if key == 10: # (how far ARA* gets depends on its time budget)
+					assert path.result == here.result
+					continue
+				assert (path.path, path.cost, path.result) == (here.path, here.cost, here.result)
+				assert path.closed == set(here.closed)
+
+def test_plan_paths(world):
+	jobs = queries(world, 3)
+	paths = plan_paths(world.graph, jobs, search=3, processes=1)
+	assert [path.path for path in paths] == [SEARCHES[3](world.graph, s, t).path for s, t in jobs]
@@ -0,0 +1,42 @@
+''' Tests of BoxWorld with no window (or pyglet). '''
+import os
+import subprocess
+import sys
+from box_world import BoxWorld
+from searches import SEARCHES
+from test_searches import MAPS
+
+
+class RecordingView(object):
+	''' Stands in for a BoxWorldView, and notes what it is told. '''
+
+	def __init__(self):
+		self.told = []
+
+	def __getattr__(self, name):
+		return lambda *args: self.told.append((name, *args))
+
+def test_no_pyglet_needed():
+	# (in a new process, as another module here might have imported it)
+	code = 'import sys, box_world, box_map; sys.exit("pyglet" in sys.modules)'
+	assert subprocess.call([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__))) == 0
+
+def test_load_and_plan_without_a_view():
+	world = BoxWorld.FromFile(MAPS[0])
+	path = world.plan_path(4, 0)
+	assert world.path is path and world.view is None
+	assert path.path == SEARCHES[4](world.graph, world.start, world.target).path
+
+def test_view_is_told_of_changes():
+	world = BoxWorld.FromFile(MAPS[0])
+	world.graph # (built first, as a view does)
+	world.view = view = RecordingView()
+	world.set_type(0, 'm')
+	world.set_target(5)
+	path = world.plan_path(3, 0)
+	assert view.told == [('box_changed', 0), ('navgraph_updated', 0),
+		('markers_moved',), ('show_path', path)]
+	assert world.tile_type(0) == 'MUD'
+	world.set_type(1, 'no such type') # (ignored)
+	world.reset_navgraph()
+	assert view.told[-1] == ('navgraph_reset',) and world.path is None
@@ -0,0 +1,52 @@
+''' Tests of the flow field, against reverse Dijkstra searches of the navgraph. '''
+import random
+import numpy as np
+import pytest
+from box_map import box_types
+from box_world import BoxWorld
+from flow_field import FlowField
+from searches import _costs_from
+from test_searches import SEEDS, edit
+
+
+def check_field(world, field):
+	graph = world.graph
+	cost_g = _costs_from(graph, field.target_idx, reverse=True)[0]
+	for idx in range(len(world.types)):
+		if idx not in cost_g:
+			assert field.cost_to_target(idx) == float('inf')
+			assert field.next_box(idx) == -1 and field.path(idx) == []
+			continue
+		assert field.cost_to_target(idx) == pytest.approx(cost_g[idx])
+		path = field.path(idx)
+		assert path[0] == idx and path[-1] == field.target_idx
+		assert all(graph.is_edge(i, j) for i, j in zip(path[:-1], path[1:]))
+		assert graph.path_cost(path) == pytest.approx(cost_g[idx])
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_costs_match_dijkstra(seed):
+	world = BoxWorld.Random(24, 18, seed=seed)
+	rand = random.Random(seed)
+	field = FlowField(world, box_types)
+	for _ in range(3):
+		field.update(world.target)
+		check_field(world, field)
+		edit(world, rand, 10)
+
+def test_only_recomputed_when_needed():
+	world = BoxWorld.Random(16, 16, seed=4)
+	field = world.flow_field()
+	assert field.target_idx == world.target
+	assert not field.update(world.target)
+	world.set_type(0, 'MUD')
+	assert field.update(world.target)
+	assert not field.update(world.target)
+	assert field.update(world.start)
+	assert world.flow_field(world.start) is field
+
+def test_many_agents_step_at_once():
+	world = BoxWorld.Random(16, 16, seed=5)
+	field = world.flow_field()
+	agents = np.array([i for i in range(len(world.types)) if field.next_box(i) != -1])
+	steps = field.next_box(agents)
+	assert list(steps) == [field.next_box(int(i)) for i in agents]
@@ -0,0 +1,46 @@
+''' Tests of the hierarchical (HPA*) planner. '''
+import random
+import pytest
+from box_map import BoxMap
+from hpa import HierarchicalPlanner
+from test_searches import check, edit, optimal, queries
+
+
+def abstract_edges(planner):
+	return {(idx, dest): planner.graph.get_edge(idx, dest).cost
+		for idx in planner.graph.nodes for dest in planner.graph.get_neighbours(idx)}
+
+@pytest.mark.parametrize('smoothing', (False, True))
+def test_paths_are_real_paths(smoothing):
+	world = BoxMap.Random(40, 40, seed=6)
+	planner = world.hierarchy() # (so it is told about the changed boxes)
+	planner.smoothing = smoothing
+	rand = random.Random(6)
+	for _ in range(3):
+		for s, t in queries(world, rand, 20):
+			check(world.graph, planner.search(s, t), s, t, optimal(world.graph, s, t), False)
+		edit(world, rand, 10)
+
+def test_update_matches_a_new_planner():
+	world = BoxMap.Random(40, 40, seed=7)
+	planner = world.hierarchy()
+	rand = random.Random(7)
+	for _ in range(5):
+		edit(world, rand, 10)
+		planner.update()
+		built = HierarchicalPlanner(world)
+		assert abstract_edges(planner) == pytest.approx(abstract_edges(built))
+		assert planner.segments == built.segments
+
+def test_refine_does_not_search():
+	world = BoxMap.Random(40, 40, seed=8)
+	planner = world.hierarchy()
+	s, t = world.start, world.target
+	steps = planner.search_steps(s, t)
+	result = next(steps)
+	for _ in steps:
+		pass
+	def search(*args, **kwargs):
+		raise AssertionError('searched while refining')
+	planner._cluster_costs = search
+	check(world.graph, result(), s, t, optimal(world.graph, s, t), False)
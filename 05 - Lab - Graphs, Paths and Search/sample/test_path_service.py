@@ -0,0 +1,61 @@
+''' Tests of the PathService and of BoxWorld.request_path. '''
+from concurrent.futures import CancelledError
+import pytest
+from box_world import BoxWorld
+from path_service import PathService
+from searches import SEARCHES
+
+
+@pytest.fixture
+def world():
+	return BoxWorld.Random(30, 30, seed=21)
+
+def test_path_matches_search(world):
+	with PathService(chunk=16) as service:
+		for search in (3, 4, 8, 9):
+			future = service.submit(world.graph, search, world.start, world.target)
+			path = future.result(timeout=10)
+			assert path.path == SEARCHES[search](world.graph, world.start, world.target).path
+
+def test_limited_request(world):
+	with PathService(chunk=4) as service:
+		path = service.submit(world.graph, 4, world.start, world.target, limit=10).result(timeout=10)
+		assert path.steps == SEARCHES[4](world.graph, world.start, world.target, 10).steps == 10
+
+def test_only_latest_on_channel_is_called(world):
+	called = []
+	with PathService() as service:
+		with service.lock: # (so neither has finished before both are asked for)
+			first = service.submit(world.graph, 3, world.start, world.target,
+				channel='path', callback=lambda path: called.append('first'))
+			second = service.submit(world.graph, 4, world.start, world.target,
+				channel='path', callback=lambda path: called.append('second'))
+		second.result(timeout=10)
+		with pytest.raises(CancelledError):
+			first.result(timeout=10)
+		service.poll()
+	assert called == ['second']
+
+def test_graph_change_cancels(world):
+	with PathService() as service:
+		with service.lock:
+			future = service.submit(world.graph, 4, world.start, world.target)
+			world.set_type(world.start, 'MUD')
+		with pytest.raises(CancelledError):
+			future.result(timeout=10)
+
+def test_status_after_cached_path(world):
+	# a background search, then a cached one asked for before it is done
+	planned = []
+	with PathService() as service:
+		world.plan_path(4, 0) # (cached)
+		with service.lock:
+			future = world.request_path(service, 3, 0, lambda: planned.append(3))
+			assert future is not None
+			assert world.request_path(service, 4, 0, lambda: planned.append(4)) is None
+		assert planned == [4] # (called now, not by poll)
+		with pytest.raises(CancelledError):
+			future.result(timeout=10)
+		service.poll()
+	assert planned == [4]
+	assert world.path.path == SEARCHES[4](world.graph, world.start, world.target).path
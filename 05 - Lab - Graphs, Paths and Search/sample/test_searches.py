@@ -0,0 +1,387 @@
+''' Tests of the searches, graphs and map files. Run with pytest:
+
+	python -m pytest test_searches.py
+
+Every search is checked against a plain Dijkstra search (the optimal cost) on
+small seeded random maps, before and after boxes are changed, using the map's
+own heuristic (Manhattan distance times min_edge_cost).
+
+'''
+import os
+import random
+from collections import deque
+import pytest
+from box_map import BoxMap, BoxTypes, read_map, convert_map
+from box_world import BoxWorld
+from graph import SparseGraph, FrozenGraph, Node, Edge
+import searches
+from searches import SEARCHES, PathCache, ResumableSearch, CountingQueue, _costs_from, run_search
+from dense_searches import DENSE_SEARCHES
+from contraction import ContractionHierarchy
+
+OPTIMAL = (3, 4, 5, 6, 7, 9, 10, 11) # searches that always find the lowest cost
+SEEDS = (1, 2, 3)
+MAPS = [os.path.join(os.path.dirname(__file__), name) for name in ('map1.txt', 'map2.txt')]
+EDITS = ('CLEAR', 'MUD', 'WATER', 'WALL')
+
+
+def make_map(seed, size=14):
+	return BoxMap.Random(size, size, seed=seed)
+
+def edit(world, rand, count=6):
+	''' Change a few random boxes. '''
+	for _ in range(count):
+		world.set_type(rand.randrange(len(world.types)), rand.choice(EDITS))
+
+def queries(world, rand, count=12):
+	''' Pairs of (non-wall) boxes, including the map start and target. '''
+	idxs = [i for i in range(len(world.types)) if world.tile_type(i) != 'WALL']
+	return [(world.start, world.target)] + [tuple(rand.sample(idxs, 2)) for _ in range(count)]
+
+def optimal(graph, source_idx, target_idx):
+	return _costs_from(graph, source_idx, target_idx=target_idx)[0].get(target_idx)
+
+def check(graph, path, source_idx, target_idx, best, exact):
+	''' The path is a real path of the graph, found only if there is one, and
+	its cost is the best (if exact) or no better than it. '''
+	if best is None:
+		assert path.result == 'Failed.'
+		return
+	assert path.result == 'Success! Done!'
+	assert path.path[0] == source_idx and path.path[-1] == target_idx
+	assert all(graph.is_edge(i, j) for i, j in zip(path.path[:-1], path.path[1:]))
+	assert path.cost == pytest.approx(graph.path_cost(path.path))
+	if exact:
+		assert path.cost == pytest.approx(best)
+	else:
+		assert path.cost >= best - 1e-9
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_searches_match_dijkstra(seed):
+	world = make_map(seed)
+	rand = random.Random(seed)
+	for _ in range(3): # then again after some boxes are changed
+		for s, t in queries(world, rand):
+			best = optimal(world.graph, s, t)
+			for key, search in SEARCHES.items():
+				args = {'budget': float('inf')} if key == 10 else {}
+				path = search(world.graph, s, t, **args)
+				check(world.graph, path, s, t, best, key in OPTIMAL)
+		edit(world, rand)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_dense_searches_match_dijkstra(seed):
+	world = make_map(seed)
+	rand = random.Random(seed)
+	for _ in range(3):
+		frozen = world.graph.freeze()
+		for s, t in queries(world, rand):
+			best = optimal(world.graph, s, t)
+			for key, search in DENSE_SEARCHES.items():
+				for graph in (world.graph, frozen):
+					path = search(graph, s, t)
+					check(world.graph, path, s, t, best, key in (3, 4))
+					if key in (3, 4): # the same path as the matching search
+						assert path.path == SEARCHES[key](world.graph, s, t).path
+		edit(world, rand)
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_contraction_hierarchy_matches_dijkstra(seed):
+	world = make_map(seed)
+	rand = random.Random(seed)
+	for _ in range(2): # the hierarchy is built again after changes
+		ch = ContractionHierarchy.FromGraph(world.graph)
+		for s, t in queries(world, rand):
+			check(world.graph, ch.query(s, t), s, t, optimal(world.graph, s, t), True)
+		edit(world, rand)
+
+def test_unreachable_target_fails_without_steps():
+	world = make_map(4, 10)
+	for idx in (44, 46, 35, 55): # wall in box 45
+		world.set_type(idx, 'WALL')
+	world.set_type(45, 'CLEAR')
+	source = next(i for i in range(100) if world.tile_type(i) != 'WALL' and i != 45)
+	for graph in (world.graph, world.graph.freeze()):
+		assert not graph.connected(source, 45)
+		for search in list(SEARCHES.values()) + list(DENSE_SEARCHES.values()):
+			path = search(graph, source, 45)
+			assert path.result == 'Failed.' and path.steps == 0
+
+
+def weak_labels(graph):
+	''' Components found from scratch, by a BFS following edges both ways. '''
+	labels = {}
+	for root in graph.nodes:
+		if root in labels:
+			continue
+		labels[root] = root
+		queue = deque([root])
+		while queue:
+			idx = queue.popleft()
+			for dest in (*graph.edgelist[idx], *graph.in_edgelist[idx]):
+				if dest not in labels:
+					labels[dest] = root
+					queue.append(dest)
+	return labels
+
+@pytest.mark.parametrize('digraph', (False, True))
+def test_connected_matches_bfs(digraph):
+	rand = random.Random(5)
+	for _ in range(40):
+		graph = SparseGraph(digraph=digraph)
+		for idx in range(16):
+			graph.add_node(Node(idx))
+		for _ in range(120):
+			idxs = list(graph.nodes)
+			r = rand.random()
+			if r < 0.5 and len(idxs) > 1:
+				graph.add_edge(Edge(*rand.sample(idxs, 2)))
+			elif r < 0.85 and idxs:
+				idx = rand.choice(idxs)
+				if graph.edgelist[idx]:
+					graph.remove_edge(idx, rand.choice(list(graph.edgelist[idx])))
+			elif r < 0.95 and idxs:
+				graph.remove_node(rand.choice(idxs))
+			else:
+				graph.add_node(Node())
+			if rand.random() < 0.2: # (so some changes are checked together)
+				labels = weak_labels(graph)
+				for idx1 in graph.nodes:
+					for idx2 in graph.nodes:
+						assert graph.connected(idx1, idx2) == (labels[idx1] == labels[idx2])
+				assert graph.num_components() == len(set(labels.values()))
+
+def test_connected_matches_bfs_on_map():
+	world = make_map(6, 20)
+	rand = random.Random(6)
+	for _ in range(10):
+		edit(world, rand, 10)
+		labels = weak_labels(world.graph)
+		frozen = world.graph.freeze()
+		for s, t in queries(world, rand, 30):
+			assert world.graph.connected(s, t) == (labels[s] == labels[t])
+			assert frozen.connected(s, t) == (labels[s] == labels[t])
+
+
+def test_frozen_graph_round_trip(tmp_path):
+	world = make_map(7)
+	graph = world.graph
+	graph.remove_node(0) # so the idx values have a gap
+	filename = str(tmp_path / 'graph.bin')
+	graph.save(filename)
+	for mmap in (True, False):
+		frozen = FrozenGraph.FromFile(filename, mmap)
+		frozen.cost_h = graph.cost_h
+		assert frozen.num_nodes() == graph.num_nodes()
+		assert frozen.num_edges() == graph.num_edges()
+		for idx in graph.nodes:
+			assert frozen.get_neighbours(idx) == graph.get_neighbours(idx)
+			assert frozen.get_predecessors(idx) == graph.get_predecessors(idx)
+			for dest in graph.get_neighbours(idx):
+				assert frozen.get_edge(idx, dest).cost == graph.get_edge(idx, dest).cost
+		assert not frozen.is_node(0)
+		path = SEARCHES[4](frozen, world.start, world.target)
+		assert path.path == SEARCHES[4](graph, world.start, world.target).path
+
+def test_binary_map_round_trip(tmp_path):
+	world = make_map(8)
+	text, binary = str(tmp_path / 'map.txt'), str(tmp_path / 'map.bmap')
+	world.save(text)
+	world.save_binary(binary)
+	for filename in (text, binary):
+		loaded = BoxMap.FromFile(filename)
+		assert list(loaded.types) == world.types
+		assert (loaded.start, loaded.target) == (world.start, world.target)
+		assert loaded.graph.edgelist.keys() == world.graph.edgelist.keys()
+		for idx in world.graph.nodes:
+			assert loaded.graph.get_neighbours(idx) == world.graph.get_neighbours(idx)
+	loaded = BoxMap.FromFile(binary)
+	assert isinstance(loaded.types, BoxTypes)
+	with open(binary, 'rb') as f:
+		data = f.read()
+	loaded.set_type(0, 'WALL') # changes the map, not the file
+	assert loaded.tile_type(0) == 'WALL'
+	with open(binary, 'rb') as f:
+		assert f.read() == data
+	back = str(tmp_path / 'back.txt')
+	convert_map(binary, back)
+	assert read_map(back) == read_map(text)
+
+def test_navgraph_built_when_first_used(tmp_path):
+	world = make_map(12)
+	filename = str(tmp_path / 'map.bmap')
+	world.save_binary(filename)
+	loaded = BoxMap.FromFile(filename)
+	assert loaded._graph is None
+	for box in (loaded, world): # (changed before and after it is built)
+		box.set_type(world.start, 'WALL')
+	assert loaded._graph is None
+	for idx in world.graph.nodes:
+		assert loaded.graph.get_neighbours(idx) == world.graph.get_neighbours(idx)
+	assert loaded.graph.cost_h == loaded._manhattan and loaded.graph.grid is loaded
+
+def test_binary_map_rejects_start_outside(tmp_path):
+	world = make_map(9, 6)
+	world.target = 36
+	filename = str(tmp_path / 'bad.bmap')
+	world.save_binary(filename)
+	with pytest.raises(ValueError):
+		BoxMap.FromFile(filename)
+
+
+def test_lean_path_details_after_change():
+	world = make_map(10)
+	path = run_search(world.graph, 4, world.start, world.target, lean=True)
+	world.set_type(0, 'WALL')
+	assert path.open == [] and path.closed == set()
+	assert path.note == 'details discarded (graph changed)'
+	assert len(path.route) == len(path.path)
+	assert 'Note:' in path.report()
+
+def test_ara_star_finishes_first_path():
+	world = make_map(11, 60)
+	path = SEARCHES[10](world.graph, world.start, world.target, budget=0.0)
+	assert (path.result == 'Failed.') == (optimal(world.graph, world.start, world.target) is None)
+
+@pytest.mark.parametrize('filename', MAPS)
+def test_ida_star_done_on_shipped_maps(filename):
+	# (the target is also still untried from other nodes of the path)
+	world = BoxMap.FromFile(filename)
+	path = SEARCHES[11](world.graph, world.start, world.target)
+	assert path.result == 'Success! Done!'
+	assert world.target not in path.open
+
+def test_ida_star_done_on_digraphs():
+	rand = random.Random(20)
+	for _ in range(300):
+		graph = SparseGraph(digraph=True)
+		graph.cost_h = lambda idx1, idx2: 0.0
+		for idx in range(8):
+			graph.add_node(Node(idx))
+		for _ in range(16):
+			graph.add_edge(Edge(*rand.sample(range(8), 2), cost=rand.randint(1, 4)))
+		s, t = rand.sample(range(8), 2)
+		path = SEARCHES[11](graph, s, t)
+		check(graph, path, s, t, optimal(graph, s, t), True)
+
+@pytest.mark.parametrize('filename', MAPS)
+def test_ara_star_bound_holds_on_shipped_maps(filename):
+	world = BoxMap.FromFile(filename)
+	best = optimal(world.graph, world.start, world.target)
+	for budget in (0.0, 10.0, float('inf')):
+		path = SEARCHES[10](world.graph, world.start, world.target, budget=budget)
+		assert path.cost <= path.bound * best + 1e-9
+
+def test_bidirectional_a_star_expands_fewer_than_bidirectional_dijkstra():
+	world = BoxMap.Random(64, 64, 0.10, 0.05, 0.02, seed=4) # (benchmark.py open profile)
+	rand = random.Random(4)
+	steps = {5: 0, 6: 0}
+	for s, t in queries(world, rand, 20):
+		for key in steps:
+			path = SEARCHES[key](world.graph, s, t)
+			check(world.graph, path, s, t, optimal(world.graph, s, t), True)
+			steps[key] += path.steps
+	assert steps[6] < steps[5]
+
+
+def test_graph_version_counts_changes():
+	graph = SparseGraph()
+	versions = [graph.version]
+	for change in (lambda: graph.add_node(Node(0)), lambda: graph.add_node(Node(1)),
+			lambda: graph.add_edge(Edge(0, 1)), lambda: graph.remove_edge(0, 1),
+			lambda: graph.remove_node(1)):
+		change()
+		versions.append(graph.version)
+	assert versions == sorted(set(versions))
+
+def test_path_cache_hits_until_graph_changes():
+	world = make_map(13)
+	cache = PathCache(size=3)
+	s, t = world.start, world.target
+	path = cache.search(world.graph, 4, s, t)
+	assert cache.search(world.graph, 4, s, t) is path
+	assert (cache.hits, cache.misses) == (1, 1)
+	assert cache.search(world.graph, 4, s, t, 5) is not path # (the limit is in the key)
+	world.set_type(0, 'MUD')
+	assert cache.get(world.graph, 4, s, t) is None
+	new = cache.search(world.graph, 4, s, t)
+	assert new is not path and new.path == SEARCHES[4](world.graph, s, t).path
+
+def test_path_cache_drops_least_recently_used(monkeypatch):
+	world = make_map(14)
+	cache = PathCache(size=2)
+	s, t = world.start, world.target
+	first = cache.search(world.graph, 3, s, t)
+	cache.search(world.graph, 4, s, t)
+	cache.get(world.graph, 3, s, t) # (used, so 4 is now the oldest)
+	cache.search(world.graph, 2, s, t)
+	assert cache.get(world.graph, 3, s, t) is first
+	assert cache.get(world.graph, 4, s, t) is None
+	monkeypatch.setattr(searches, 'STATS', True) # (paths with stats are cached apart)
+	assert cache.get(world.graph, 3, s, t) is None
+
+
+def same_path(path1, path2):
+	return ((path1.path, path1.steps, path1.result, sorted(path1.open), path1.closed)
+		== (path2.path, path2.steps, path2.result, sorted(path2.open), path2.closed))
+
+@pytest.mark.parametrize('key', SEARCHES)
+def test_resumable_search_matches_limited_search(key):
+	world = make_map(15)
+	s, t = world.start, world.target
+	args = {'budget': float('inf')} if key == 10 else {}
+	for limit in (1, 5, 17, 40):
+		task = ResumableSearch(world.graph, key, s, t)
+		for n in (limit // 2, limit - limit // 2): # (in two goes)
+			task.step(n)
+		path = task.result()
+		if key != 9: # (LPA* keeps its costs, so the next search is another repair)
+			assert same_path(path, SEARCHES[key](world.graph, s, t, limit, **args))
+		before = (list(path.path), sorted(path.open), set(path.closed), dict(path.route))
+		task.step(1000)
+		assert (path.path, sorted(path.open), path.closed, path.route) == before # (a snapshot)
+	task = ResumableSearch(world.graph, key, s, t)
+	while not task.step(3):
+		pass
+	assert task.done and task.result().path == SEARCHES[key](world.graph, s, t, **args).path
+
+def test_box_world_resumes_limited_search():
+	world = BoxWorld.Random(14, 14, seed=16)
+	path = world.plan_path(4, 3)
+	task = world.task
+	for limit in (4, 9):
+		path = world.plan_path(4, limit)
+		assert world.task is task and task.steps == limit
+	assert same_path(path, SEARCHES[4](world.graph, world.start, world.target, 9))
+	world.plan_path(4, 2) # (fewer steps, so a new search)
+	assert world.task is not task
+
+
+@pytest.mark.parametrize('stats', (False, True))
+def test_stats_only_counted_when_on(monkeypatch, stats):
+	monkeypatch.setattr(searches, 'STATS', stats)
+	world = make_map(17)
+	world.incremental()
+	for key, search in SEARCHES.items():
+		path = search(world.graph, world.start, world.target)
+		if not stats:
+			assert path.stats is None
+			continue
+		assert path.stats['expanded'] == path.steps
+		if key in (3, 4, 5, 6, 7): # (their open list is a queue of nodes)
+			assert path.stats['pops'] == path.steps
+			assert path.stats['generated'] >= path.stats['pushes'] - 2 > 0
+	assert isinstance(SEARCHES[3](world.graph, world.start, world.target).open, CountingQueue) == stats
+
+def test_lpa_star_stats_turned_on_and_off(monkeypatch):
+	world = make_map(18)
+	s, t = world.start, world.target
+	path = SEARCHES[9](world.graph, s, t)
+	for stats in (True, False, True):
+		monkeypatch.setattr(searches, 'STATS', stats)
+		world.set_type(path.path[len(path.path) // 2], 'WATER') # (so there is a repair)
+		path = SEARCHES[9](world.graph, s, t)
+		assert isinstance(world.lpa.open, CountingQueue) == stats
+		assert (path.stats is not None) == stats
+		assert path.cost == pytest.approx(optimal(world.graph, s, t))